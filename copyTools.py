@@ -0,0 +1,256 @@
+# file copying shared by the ERP & neuropsych GUIs -- the peaks mover, move_neuro_files & get_h1s's cnt staging.
+# data is copied by the kernel where it can be, into a temp file that's renamed into place once it's complete
+import os
+import stat
+import errno
+import hashlib
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# bytes handed to the kernel per copy_file_range/sendfile call or read per plain read
+copy_chunk = 64 << 20
+
+# files copy_file makes without keep_stat get the mode any new file would
+umask = os.umask(0)
+os.umask(umask)
+
+# md5sum style manifest (`md5sum -c .checksums.md5` checks a folder) of the files copied into a folder
+checksums_name = '.checksums.md5'
+
+
+def kernel_copy(infd, outfd):
+    """
+    copies everything from infd's position on to outfd -- copy_file_range (which NFS 4.2 can do server side),
+    sendfile if that's not supported between the 2 files, plain reads & writes if neither is. returns the bytes copied
+    """
+
+    copied = 0
+    for name in ('copy_file_range', 'sendfile'):
+        if not hasattr(os, name):
+            continue
+        try:
+            while True:
+                if name == 'copy_file_range':
+                    n = os.copy_file_range(infd, outfd, copy_chunk)
+                else:
+                    n = os.sendfile(outfd, infd, None, copy_chunk)
+                if n == 0:
+                    return copied
+                copied+=n
+        except OSError as e:
+            # not supported for these 2 files, the next way carries on from where this stopped
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF):
+                raise
+
+    return copied + hash_copy(infd, outfd)
+
+
+def hash_copy(infd, outfd, digest=None):
+    """
+    copies everything from infd's position on to outfd with plain reads & writes, feeding each
+    chunk to digest (a hashlib object) on the way so the data's only read once. returns the bytes copied
+    """
+
+    copied = 0
+    while True:
+        data = memoryview(os.read(infd, copy_chunk))
+        if not data:
+            return copied
+        if digest is not None:
+            digest.update(data)
+        copied+=len(data)
+        while data:
+            data = data[os.write(outfd, data):]
+
+
+def copy_file(src, dst, digest=None, keep_stat=True):
+    """
+    copies src to dst through a temp file next to dst that's renamed over it, so dst is never half written.
+    keeps src's permission bits & mtime (a new file's mode & now without keep_stat), returns the bytes copied.
+    with digest (a hashlib object) the data's copied through userspace & hashed as it goes, since the kernel's
+    copies never hand it to us
+    """
+
+    st = os.stat(src)
+    fd, tmp = tempfile.mkstemp(prefix='.{}.'.format(os.path.basename(dst)), suffix='.tmp', dir=os.path.dirname(dst) or '.')
+    try:
+        with open(src, 'rb') as fsrc:
+            if digest is None:
+                copied = kernel_copy(fsrc.fileno(), fd)
+            else:
+                copied = hash_copy(fsrc.fileno(), fd, digest)
+        if copied != st.st_size:
+            raise OSError(errno.EIO, "{} bytes copied of {}, it changed while it was copied".format(copied, st.st_size), src)
+        os.close(fd)
+        fd = None
+        if keep_stat:
+            os.chmod(tmp, stat.S_IMODE(st.st_mode))
+            os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        else:
+            os.chmod(tmp, 0o666 & ~umask)
+        os.replace(tmp, dst)
+    except BaseException:
+        if fd is not None:
+            os.close(fd)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return st.st_size
+
+
+class checksum_manifest:
+    """
+    a folder's checksums_name file -- md5 of every file copied into it. a checksum is only given back
+    by get while the file's no newer than the manifest, so one that's been changed since gets hashed again
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, checksums_name)
+        self.lock = threading.Lock()
+        self.md5s = {}
+        self.mtime = 0
+        if os.path.exists(self.path):
+            self.mtime = os.stat(self.path).st_mtime
+            with open(self.path) as f:
+                for line in f:
+                    md5, sep, name = line.rstrip('\n').partition('  ')
+                    if sep:
+                        self.md5s[name] = md5
+
+    def get(self, name):
+        """
+        name's md5, None if it's not in the manifest or it's changed since it was
+        """
+
+        md5 = self.md5s.get(name)
+        if md5 is None:
+            return None
+        try:
+            if os.stat(os.path.join(self.folder, name)).st_mtime > self.mtime:
+                return None
+        except OSError:
+            return None
+        return md5
+
+    def add(self, name, md5):
+        """
+        appends name's md5, the last line for a name is the one that counts
+        """
+
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write('{}  {}\n'.format(md5, name))
+            self.md5s[name] = md5
+            self.mtime = os.stat(self.path).st_mtime
+
+
+class copy_engine:
+    """
+    copies (src, dst) pairs workers at a time with copy_file, skipping the ones already at dst.
+    with verify every copy is md5'd as it's made, checked against the source folder's checksum_manifest
+    (when it has 1) & added to dst's. that costs no extra reads but the data goes through userspace (hash_copy)
+    instead of copy_file_range/sendfile, since the kernel's copies never hand it to us. copy_all prints how it's going every report_every seconds, report once it's done
+    """
+
+    def __init__(self, workers=8, overwrite=False, report_every=10, verify=False):
+        self.workers = workers
+        self.overwrite = overwrite
+        self.report_every = report_every
+        self.verify = verify
+        # folder => its checksum_manifest, made as they're first needed
+        self.manifests = {}
+        self.lock = threading.Lock()
+        self.start = time.monotonic()
+        self.files = 0
+        self.bytes = 0
+        self.skipped = 0
+        # dst => why it couldn't be copied
+        self.errors = {}
+
+    def manifest(self, folder):
+        with self.lock:
+            if folder not in self.manifests:
+                self.manifests[folder] = checksum_manifest(folder)
+            return self.manifests[folder]
+
+    def identical(self, src, dst):
+        """
+        same size & mtime (to the second, what NFS keeps) -- how every copy_file copy looks next to its source
+        """
+
+        a, b = os.stat(src), os.stat(dst)
+        return a.st_size == b.st_size and abs(a.st_mtime - b.st_mtime) < 1
+
+    def copy(self, src, dst):
+        """
+        copies 1 file, returns 'copied', 'identical' (dst already matches src), 'exists' (dst is there
+        & differs, only replaced with overwrite) or 'failed' (why is in errors)
+        """
+
+        try:
+            if os.path.exists(dst):
+                if self.identical(src, dst):
+                    with self.lock:
+                        self.skipped+=1
+                    return 'identical'
+                if not self.overwrite:
+                    with self.lock:
+                        self.skipped+=1
+                    return 'exists'
+            if self.verify:
+                size = self.verified_copy(src, dst)
+            else:
+                size = copy_file(src, dst)
+        except OSError as e:
+            with self.lock:
+                self.errors[dst] = str(e)
+            return 'failed'
+
+        with self.lock:
+            self.files+=1
+            self.bytes+=size
+        return 'copied'
+
+    def verified_copy(self, src, dst):
+        """
+        copy_file that md5s the data on the way through -- dst is removed if that doesn't match the
+        md5 src's folder has for it, otherwise it goes in dst's folder's manifest. with no md5 for src
+        only copy_file's check that every byte of src was written stands
+        """
+
+        digest = hashlib.md5()
+        size = copy_file(src, dst, digest)
+        md5 = digest.hexdigest()
+        expected = self.manifest(os.path.dirname(os.path.abspath(src))).get(os.path.basename(src))
+        if expected is not None and expected != md5:
+            os.remove(dst)
+            raise OSError(errno.EIO, "md5 {} doesn't match the {} in {}'s {}".format(md5, expected, os.path.dirname(src), checksums_name), src)
+        self.manifest(os.path.dirname(os.path.abspath(dst))).add(os.path.basename(dst), md5)
+        return size
+
+    def copy_all(self, pairs):
+        """
+        yields (src, dst, status) for every pair, in the order given, as soon as it & everything before it is done
+        """
+
+        pairs = list(pairs)
+        last = time.monotonic()
+        with ThreadPoolExecutor(self.workers) as pool:
+            for (src, dst), status in zip(pairs, pool.map(lambda pair: self.copy(*pair), pairs)):
+                if time.monotonic() - last >= self.report_every:
+                    self.report()
+                    last = time.monotonic()
+                yield src, dst, status
+
+    def report(self):
+        """
+        prints files & bytes copied so far & how fast
+        """
+
+        elapsed = max(time.monotonic() - self.start, 1e-6)
+        print(">>> {} files ({:.1f} MB) copied in {:.0f}s -- {:.1f} MB/s, {:.1f} files/s, {} already there, {} failed <<<".format(
+              self.files, self.bytes / 1e6, elapsed, self.bytes / 1e6 / elapsed, self.files / elapsed, self.skipped, len(self.errors)))
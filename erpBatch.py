@@ -0,0 +1,307 @@
+# command line version of the ERP GUI tabs -- runs without PyQt5 so it can be scheduled from cron
+#
+#   python3 erpBatch.py review /vol01/active_projects/anthony/ns650 --workers 8
+#   python3 erpBatch.py shell-check /vol01/active_projects/anthony/ns650
+#   python3 erpBatch.py size-limits /vol01/active_projects/anthony
+#   python3 erpBatch.py h1 /vol01/active_projects/anthony/ns650 --exps vp3 ant --trg-dir /vol01/active_projects/anthony/test_qt
+#   python3 erpBatch.py h1 /vol01/active_projects/anthony/ns650 --exps all --ps
+#   python3 erpBatch.py h1-resume
+#   python3 erpBatch.py move-peaks /vol01/active_projects/anthony/waitingOn/erp_dec_suny suny
+#   python3 erpBatch.py metrics --by exp
+#
+# JSON lines go to stdout, the same text the GUI shows goes to stderr.
+# exit codes: 0 = ran & found nothing wrong, 1 = ran & found problems, 2 = bad input
+import sys
+import os
+import argparse
+import json
+import functools
+from contextlib import redirect_stdout
+
+from erpTools import (ep, sd, default_size_limits, review_cache, review_writer, h1_store, default_h1_store, default_h1_store_cap, h1_journal, default_h1_journal,
+                      tool_metrics, default_tool_metrics, h1_folders, prefetch_folders, start_mover, checkIds, folder_index)
+
+
+class json_rows:
+    """
+    review_writer look-alike that prints findings to stdout as JSON lines, optionally also exporting them
+    """
+
+    def __init__(self, out, export=None):
+        self.out = out
+        self.export = export
+        self.problems = 0
+
+    def write_rows(self, rows):
+        for row in rows:
+            if row[2] != 'ok':
+                self.problems+=1
+            emit(self.out, dict(zip(review_writer.columns, row)))
+        if self.export:
+            self.export.write_rows(rows)
+
+
+def emit(out, obj):
+    out.write(json.dumps(obj) + '\n')
+    out.flush()
+
+
+def review(args, out):
+    """
+    Review ERP Data tab
+    """
+
+    dirs = ep.plan_review(args.directory)
+    print(">>> {} FOLDERS TO REVIEW ON {} WORKER(S) <<<".format(len(dirs), args.workers))
+
+    cache = review_cache(args.cache, ep.review_version) if args.cache else None
+    export = review_writer(args.export, args.format) if args.export else None
+    rows = json_rows(out, export)
+
+    count = 0
+    for i, report in zip(dirs, ep.iter_review(dirs, args.workers, cache, rows, args.prefetch)):
+        count+=1
+        print("\n\n{} || {}".format(count, i)), print(report, end='')
+    ep.print_site_missing(dirs)
+
+    if cache:
+        cache.close()
+    if export:
+        export.close()
+    return 1 if rows.problems else 0
+
+
+def shell_check(args, out):
+    """
+    Run Shell Scripts tab
+    """
+
+    failed = 0
+    for check in ep.iter_shell_check(args.directory, args.workers, args.timeout):
+        if check['erp_check_code'] != 0 or check['size_check_code'] != 0:
+            failed+=1
+        emit(out, check)
+    return 1 if failed else 0
+
+
+def size_limits(args, out):
+    """
+    measures the (exp, ext) file size limits reviews check against from the site data under directory
+    """
+
+    dirs = ep.plan_review(args.directory)
+    rows = ep.measure_size_limits(dirs, args.margin, args.min_files)
+    if not rows:
+        print("ERROR: no exp had {} or more cnt/avg/dat files under {}".format(args.min_files, args.directory))
+        return 2
+    for row in rows:
+        emit(out, row)
+    ep.save_size_limits(rows, args.file)
+    print(">>> SIZE LIMITS OF {} EXP/EXTENSIONS FROM {} FOLDERS WRITTEN TO {} <<<".format(len(rows), len(dirs), args.file))
+    return 0
+
+
+def h1(args, out):
+    """
+    H1 - Peak Picking tab with --trg-dir, H1 - Viewing ps files tab with --ps
+    """
+
+    if not args.trg_dir and not args.ps:
+        print("ERROR: h1 needs --trg-dir (peak picking) or --ps (viewing ps files)")
+        return 2
+
+    exps = set(ep.dat_exps) if 'all' in args.exps else set(args.exps)
+    bad_exps = exps - set(ep.dat_exps)
+    if bad_exps:
+        print("ERROR: {} aren't ERP experiments".format(', '.join(sorted(bad_exps))))
+        return 2
+
+    store = h1_store(args.store, args.store_gb * 1e9) if args.store else None
+
+    if args.plan:
+        plan = []
+        for i in h1_folders(args.directory, args.exclude):
+            if args.trg_dir:
+                plan.extend(sd.plan_get_h1s(i, exps, del_ext=True, trg_dir=args.trg_dir, store=store))
+            else:
+                plan.extend(sd.plan_get_h1s(i, exps, ps=True, store=store))
+        for step in plan:
+            emit(out, step._asdict())
+        runs, estimate = sd.print_h1_plan(plan, args.workers, args.ps_workers)
+        emit(out, {'runs': runs, 'estimated_seconds': estimate})
+        return 0
+
+    if args.trg_dir:
+        h1_args = dict(set_of_exps=exps, del_ext=True, trg_dir=args.trg_dir, workers=args.workers, batch_tools=args.batch_tools,
+                       scratch=args.scratch, scratch_cap=args.scratch_gb and args.scratch_gb * 1e9)
+    else:
+        h1_args = dict(set_of_exps=exps, ps=True, workers=args.workers, ps_workers=args.ps_workers, ps_timeout=args.ps_timeout,
+                       batch_tools=args.batch_tools)
+
+    folders = h1_folders(args.directory, args.exclude)
+    journal = h1_journal(args.journal) if args.journal else None
+    if journal:
+        journal.start(folders, h1_args)
+    return run_h1s(folders, h1_args, store, journal, args.prefetch, out)
+
+
+def h1_resume(args, out):
+    """
+    finishes the last h1 batch that was stopped halfway, with the settings it was started with
+    """
+
+    journal = h1_journal(args.journal)
+    left = journal.resume()
+    if left is None:
+        print("ERROR: no h1 batch to resume in {}".format(args.journal))
+        return 2
+    folders, h1_args = left
+    print(">>> RESUMING H1 BATCH -- {} OF {} FOLDERS LEFT <<<".format(len(folders), len(journal.batch['folders'])))
+
+    store = h1_store(args.store, args.store_gb * 1e9) if args.store else None
+    return run_h1s(folders, h1_args, store, journal, args.prefetch, out)
+
+
+def run_h1s(folders, h1_args, store, journal, ahead, out):
+    """
+    get_h1s on every folder, 1 JSON line per folder. the next ahead folders' files are read ahead.
+    returns 1 if any cnt file had a cnt.h1/avg.h1/ps step fail anywhere
+    """
+
+    count = 0
+    failures = 0
+    for i in prefetch_folders(folders, ahead, functools.partial(sd.h1_input, set_of_exps=h1_args['set_of_exps'])):
+        count+=1
+        print("\n\n{}".format(count))
+        failed = sd.get_h1s(i, store=store, journal=journal, **h1_args)
+        failures+=failed
+        plots = {k: sd.ps_results.count(k) for k in ('succeeded', 'failed', 'timed out')}
+        emit(out, {'folder': i, 'exps': sorted(h1_args['set_of_exps']), 'trg_dir': h1_args.get('trg_dir'), 'ps': bool(h1_args.get('ps')),
+                   'failed_cnts': failed, 'plots': plots, 'from_store': len(sd.fetched)})
+
+    if store:
+        store.close()
+    if journal:
+        journal.close()
+    return 1 if failures else 0
+
+
+def move_peaks(args, out):
+    """
+    H1 - Move Peak Picked Files tab -- nothing's moved if any sub id isn't from site
+    """
+
+    index = folder_index(args.directory)
+    unique_ids = set(rec.sub_id for rec in index.records if rec and rec.ext in ('h1', 'mt', 'pdf'))
+    wrong_site = [i for i in sorted(unique_ids) if not checkIds(i, args.site)]
+    if wrong_site:
+        print("ERROR: {} sub ids don't match {}, nothing was moved".format(len(wrong_site), args.site))
+        emit(out, {'folder': args.directory, 'site': args.site, 'sub_ids': len(unique_ids), 'wrong_site': wrong_site})
+        return 1
+
+    failed = start_mover(args.directory, args.site, index)
+    emit(out, {'folder': args.directory, 'site': args.site, 'sub_ids': len(unique_ids), 'failed_copies': failed})
+    return 1 if failed else 0
+
+
+def metrics(args, out):
+    """
+    per tool (or exp) throughput & wall clock percentiles of every logged run_tool run
+    """
+
+    log = tool_metrics(args.file)
+    rows = log.summary(args.by)
+    if not rows:
+        print("ERROR: no tool runs logged in {}".format(args.file))
+        return 2
+    for row in rows:
+        emit(out, row)
+    log.print_summary(rows, args.by)
+    return 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Run the ERP GUI checks from the command line')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    p = commands.add_parser('review', help='Review ERP Data')
+    p.add_argument('directory')
+    p.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    p.add_argument('--cache', help='review_cache sqlite file, folders that are unchanged since the last run are skipped')
+    p.add_argument('--export', help='also write findings to EXPORT.<format>')
+    p.add_argument('--format', default='csv', choices=['csv', 'jsonl', 'parquet'])
+    p.add_argument('--prefetch', type=int, default=2, help='folders listed ahead of the one being reviewed with 1 worker, 0 for none')
+    p.set_defaults(func=review)
+
+    p = commands.add_parser('shell-check', help='Run Shell Scripts')
+    p.add_argument('directory')
+    p.add_argument('--workers', type=int, default=8, help='folders checked at once')
+    p.add_argument('--timeout', type=float, help='seconds before a shell script is killed')
+    p.set_defaults(func=shell_check)
+
+    p = commands.add_parser('size-limits', help='measure the file size limits reviews check against from site data')
+    p.add_argument('directory')
+    p.add_argument('--file', default=default_size_limits)
+    p.add_argument('--margin', type=float, default=0.5, help='fraction below the smallest & above the largest size found that is still allowed')
+    p.add_argument('--min-files', type=int, default=20, help="files an exp/extension needs before it's given limits")
+    p.set_defaults(func=size_limits)
+
+    p = commands.add_parser('h1', help='H1 - Peak Picking (--trg-dir) or H1 - Viewing ps files (--ps)')
+    p.add_argument('directory')
+    p.add_argument('--exps', nargs='+', required=True, help="experiments to make h1's for, or all")
+    p.add_argument('--trg-dir')
+    p.add_argument('--ps', action='store_true')
+    p.add_argument('--exclude', nargs='*', default=[], help='folders directly inside directory to skip')
+    p.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='cnt files worked on at once')
+    p.add_argument('--ps-workers', type=int, help='plot_hdf1_data.sh runs at once with --ps, defaults to --workers')
+    p.add_argument('--ps-timeout', type=float, help='seconds before a plot_hdf1_data.sh run is killed')
+    p.add_argument('--store', default=default_h1_store, help='h1_store folder avg.h1 files are reused from')
+    p.add_argument('--no-store', dest='store', action='store_const', const=None, help="don't use the h1_store")
+    p.add_argument('--store-gb', type=float, default=default_h1_store_cap / 1e9, help='least recently used avg.h1 files are removed from the store past this many GB')
+    p.add_argument('--batch-tools', nargs='+', default=[], choices=sorted(sd.h1_tools.values()),
+                   help='tools that take several files in 1 run -- run once per batch of files instead of once per file')
+    p.add_argument('--scratch', help='local folder (e.g. /dev/shm) --trg-dir cnts are worked on in, only avg.h1 files go to --trg-dir')
+    p.add_argument('--scratch-gb', type=float, help='most GB --scratch is given, defaults to 90%% of its free space')
+    p.add_argument('--plan', action='store_true', help='list what would be run & how long it should take, without running it')
+    p.add_argument('--journal', default=default_h1_journal, help='h1_journal file h1-resume picks the batch up from')
+    p.add_argument('--prefetch', type=int, default=2, help='folders whose cnt/h1 files are read ahead of the one being worked on, 0 for none')
+    p.add_argument('--no-journal', dest='journal', action='store_const', const=None, help="don't journal this batch")
+    p.set_defaults(func=h1)
+
+    p = commands.add_parser('h1-resume', help='finish the last h1 batch from where it stopped')
+    p.add_argument('--journal', default=default_h1_journal)
+    p.add_argument('--store', default=default_h1_store, help='h1_store folder avg.h1 files are reused from')
+    p.add_argument('--no-store', dest='store', action='store_const', const=None, help="don't use the h1_store")
+    p.add_argument('--store-gb', type=float, default=default_h1_store_cap / 1e9, help='least recently used avg.h1 files are removed from the store past this many GB')
+    p.add_argument('--prefetch', type=int, default=2, help='folders whose cnt/h1 files are read ahead of the one being worked on, 0 for none')
+    p.set_defaults(func=h1_resume)
+
+    p = commands.add_parser('move-peaks', help='H1 - Move Peak Picked Files')
+    p.add_argument('directory')
+    p.add_argument('site')
+    p.set_defaults(func=move_peaks)
+
+    p = commands.add_parser('metrics', help='summary of the external tool runs logged by run_tool')
+    p.add_argument('--file', default=default_tool_metrics)
+    p.add_argument('--by', default='tool', choices=['tool', 'exp'])
+    p.set_defaults(func=metrics)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if 'directory' in args and not os.path.isdir(args.directory):
+        print("ERROR: {} doesn't exist.\nCheck ^^ path and run again.".format(args.directory), file=sys.stderr)
+        return 2
+
+    # everything erpTools prints is for people, keep stdout for JSON
+    out = sys.stdout
+    with redirect_stdout(sys.stderr):
+        return args.func(args, out)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
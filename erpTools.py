@@ -0,0 +1,2666 @@
+# ERP checks & H1 helpers shared by erpPyQt.py (GUI) & erpBatch.py (command line) -- no PyQt5 in here
+import sys
+import os
+
+from collections import defaultdict, Counter, namedtuple
+import re
+import subprocess
+import shutil
+import tempfile
+import functools
+import heapq
+from datetime import datetime, timedelta
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import signal
+import threading
+import time
+from contextlib import redirect_stdout
+import sqlite3
+import json
+import hashlib
+import numpy as np
+from copyTools import copy_file, copy_engine
+import csv
+
+# only needed to export review tables as parquet
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+# HBNL ERP file names => exp_version_<run letter><session>_subID + extension
+# e.g. vp3_6_a1_40001009_32.cnt, cpt_4_a1_40001009A.avg, ant_6_a1_40001009_avg.h1.ps
+# ext is the name of the extension group that matched, None if the extension isn't an ERP one
+erp_fname_re = re.compile(r"""
+    ^(?P<exp>[^_]+)_(?P<version>[^_]+)_(?P<run>[^_])(?P<session>[^_])?[^_]*_(?P<sub_id>[^_.A-Z]+)
+    (?:
+      (?P<cnt>_32\.cnt)
+    | (?P<rerun>(?:_32)?_rr\.cnt)
+    | (?P<orig_cnt>(?:_32)?_orig\.cnt)
+    | (?P<bad_orig>_32_original\.cnt)
+    | (?P<cnt_h1>_cnt\.h1)
+    | (?P<h1>_avg\.h1)
+    | (?P<h1_ps>_avg\.h1\.ps)
+    | (?P<ps>_avg\.ps)
+    | (?P<mt>_avg\.mt)
+    | (?P<pdf>.*\.pdf)
+    | (?P<avg>[_A-Z]*\.avg)
+    | (?P<dat>[_A-Z]*\.?dat)
+    | (?P<other>.*)
+    )$""", re.VERBOSE)
+
+erp_file = namedtuple('erp_file', ['exp', 'version', 'run', 'session', 'sub_id', 'ext'])
+
+
+@functools.lru_cache(maxsize=65536)
+def parse_erp_fname(fname):
+    """
+    returns an erp_file record for an HBNL ERP file name, None if the name isn't one
+    """
+    m = erp_fname_re.match(fname)
+    if m is None:
+        return None
+    ext = m.lastgroup
+    return erp_file(m.group('exp'), m.group('version'), m.group('run'), m.group('session'), m.group('sub_id'),
+                    None if ext == 'other' else ext)
+
+
+def erp_stem(fname):
+    """
+    file name up to & including the sub ID -- vp3_6_a1_40001009_32.cnt => vp3_6_a1_40001009
+    """
+    return fname[:erp_fname_re.match(fname).end('sub_id')]
+
+
+# every run_tool run is logged here -- plan_get_h1s estimates run times from it
+default_tool_metrics = os.path.join(os.path.expanduser('~'), '.hbnl_erp', 'tool_metrics.jsonl')
+
+
+class tool_metrics:
+    """
+    append only JSON lines log of external tool runs -- never stops a run if it can't be written
+    """
+
+    def __init__(self, path=default_tool_metrics):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def record(self, **fields):
+        line = json.dumps(fields) + '\n'
+        with self.lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, 'a') as f:
+                    f.write(line)
+            except OSError:
+                pass
+
+    def read(self):
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        pass
+        except OSError:
+            return
+
+    def typical_seconds(self):
+        """
+        median wall clock seconds of each tool's last 1000 runs
+        """
+
+        walls = defaultdict(list)
+        for row in self.read():
+            walls[row['tool']].append(row['wall'])
+        return {tool: float(np.median(w[-1000:])) for tool, w in walls.items()}
+
+    def summary(self, by='tool'):
+        """
+        1 row per tool (or exp) -- runs, failures, throughput & wall clock percentiles
+        """
+
+        groups = defaultdict(list)
+        for row in self.read():
+            groups[row.get(by)].append(row)
+
+        rows = []
+        for name, runs in sorted(groups.items(), key=lambda i: str(i[0])):
+            wall = np.array([i['wall'] for i in runs])
+            in_bytes = sum(i.get('input_bytes', 0) for i in runs)
+            rows.append({by: name, 'runs': len(runs),
+                         'failed': sum(i.get('exit_code') != 0 and not i.get('timed_out') for i in runs),
+                         'timed_out': sum(bool(i.get('timed_out')) for i in runs),
+                         'total_wall': float(wall.sum()),
+                         'files_per_min': 60 * len(runs) / wall.sum() if wall.sum() else None,
+                         'mb_per_sec': in_bytes / 1e6 / wall.sum() if wall.sum() else None,
+                         'p50': float(np.percentile(wall, 50)), 'p95': float(np.percentile(wall, 95)),
+                         'p99': float(np.percentile(wall, 99)),
+                         'mean_user': float(np.mean([i.get('user', 0) for i in runs])),
+                         'mean_sys': float(np.mean([i.get('sys', 0) for i in runs])),
+                         'max_rss_mb': max(i.get('max_rss_kb', 0) for i in runs) / 1024})
+        return rows
+
+    def print_summary(self, rows, by='tool'):
+        print("{:<34} {:>6} {:>6} {:>9} {:>9} {:>8} {:>8} {:>8} {:>9}".format(
+              by, 'runs', 'failed', 'files/min', 'MB/s', 'p50 s', 'p95 s', 'p99 s', 'max MB'))
+        for i in rows:
+            print("{:<34} {:>6} {:>6} {:>9.1f} {:>9.1f} {:>8.2f} {:>8.2f} {:>8.2f} {:>9.0f}".format(
+                  str(i[by]), i['runs'], i['failed'] + i['timed_out'], i['files_per_min'] or 0, i['mb_per_sec'] or 0,
+                  i['p50'], i['p95'], i['p99'], i['max_rss_mb']))
+
+
+metrics = tool_metrics()
+
+
+def run_tool(args, cwd=None, timeout=None, on_line=None):
+    """
+    runs an external tool without a shell, returns (exit code, stdout, stderr, timed out).
+    on timeout the tool & anything it started are killed. on_line gets every stdout/stderr line
+    as it's written. every run is logged to metrics with its wall clock, cpu & peak memory
+    (of the tool & everything it waited on) & input size. a tool that can't be started at all (missing,
+    not executable) comes back with the shell's exit codes for that -- 127 not found, 126 anything else
+    """
+
+    start = time.monotonic()
+    try:
+        p = subprocess.Popen(args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    except OSError as e:
+        return 127 if isinstance(e, FileNotFoundError) else 126, '', "couldn't run {} => {}".format(args[0], e), False
+
+    # read both pipes while the tool runs & reap it with wait4 to get its rusage
+    output = {}
+
+    def read(name, pipe):
+        if on_line is None:
+            output[name] = pipe.read()
+            return
+        lines = []
+        for line in iter(pipe.readline, b''):
+            lines.append(line)
+            on_line(line.decode('ascii', 'replace'))
+        output[name] = b''.join(lines)
+
+    readers = [threading.Thread(target=read, args=i) for i in (('out', p.stdout), ('err', p.stderr))]
+    reaped = []
+    reaper = threading.Thread(target=lambda: reaped.append(os.wait4(p.pid, 0)))
+    for i in readers + [reaper]:
+        i.start()
+
+    reaper.join(timeout)
+    timed_out = reaper.is_alive()
+    if timed_out:
+        try:
+            os.killpg(p.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            # it finished & was reaped right as the timeout ran out
+            pass
+        reaper.join()
+    for i in readers:
+        i.join()
+    p.stdout.close()
+    p.stderr.close()
+
+    pid, status, usage = reaped[0]
+    p.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    wall = time.monotonic() - start
+
+    inputs = [os.path.join(cwd or '', i) for i in args[1:] if os.path.isfile(os.path.join(cwd or '', i))]
+    rec = parse_erp_fname(os.path.basename(inputs[0])) if inputs else None
+    metrics.record(tool=os.path.basename(args[0]), command=' '.join(args), exp=rec.exp if rec else None,
+                   input_bytes=sum(os.path.getsize(i) for i in inputs), wall=wall, user=usage.ru_utime, sys=usage.ru_stime,
+                   max_rss_kb=usage.ru_maxrss, exit_code=p.returncode, timed_out=timed_out, stderr_bytes=len(output['err']),
+                   time=datetime.now().isoformat(timespec='seconds'))
+
+    return p.returncode, output['out'].decode('ascii', 'replace'), output['err'].decode('ascii', 'replace'), timed_out
+
+
+def arg_batches(command, files, most=None):
+    """
+    splits files into runs of command that each fit on 1 command line (xargs style) -- ARG_MAX less the
+    environment & 2048 bytes to spare, at most most files a run
+    """
+
+    room = os.sysconf('SC_ARG_MAX') - 2048 - sum(len(k) + len(v) + 2 + 8 for k, v in os.environb.items())
+    room-=sum(len(os.fsencode(i)) + 1 + 8 for i in command)
+
+    batches, batch, used = [], [], 0
+    for i in files:
+        size = len(os.fsencode(i)) + 1 + 8
+        if batch and (used + size > room or len(batch) == most):
+            batches.append(batch)
+            batch, used = [], 0
+        batch.append(i)
+        used+=size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def link_or_copy(src, dst):
+    """
+    hardlinks src to dst when they're on the same filesystem, copies it (copy_file) otherwise.
+    returns 'Linking' or 'Copying'
+    """
+
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+        return 'Linking'
+    except OSError:
+        copy_file(src, dst)
+        return 'Copying'
+
+
+def read_ahead(folder, want=None):
+    """
+    lists & stats everything under folder (warming the NFS attribute cache) & asks the kernel to start
+    reading the files want(name) picks into the page cache -- posix_fadvise WILLNEED, which returns
+    right away, or a plain read where that isn't available
+    """
+
+    for r,d,f in os.walk(folder):
+        for n in f:
+            try:
+                os.stat(os.path.join(r,n))
+                if want is None or not want(n):
+                    continue
+                with open(os.path.join(r,n), 'rb') as fh:
+                    if hasattr(os, 'posix_fadvise'):
+                        os.posix_fadvise(fh.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                    else:
+                        for chunk in iter(functools.partial(fh.read, 1 << 20), b''):
+                            pass
+            except OSError:
+                pass
+
+
+def prefetch_folders(folders, ahead=2, want=None):
+    """
+    yields folders in order while a background thread runs read_ahead on the next ahead of them,
+    so the folder after the one being worked on isn't read from a cold cache. ahead=0 turns it off
+    """
+
+    folders = list(folders)
+    current = [0]
+
+    def warm(n):
+        # already worked through, nothing to gain
+        if n >= current[0]:
+            read_ahead(folders[n], want)
+
+    with ThreadPoolExecutor(1) as pool:
+        queued = 1
+        for n, folder in enumerate(folders):
+            current[0] = n
+            queued = max(queued, n + 1)
+            while queued < min(len(folders), n + 1 + ahead):
+                pool.submit(warm, queued)
+                queued+=1
+            yield folder
+
+
+class task_graph:
+    """
+    runs tasks on a thread pool as soon as the tasks they depend on have finished.
+    a task returns (ok, message) -- anything depending on a task that failed is skipped, unless it only
+    waits for it (soft) & sorts out what failed itself. of the tasks that are ready the one furthest down a chain goes first (then the one added first), so
+    1 file's steps finish & clean up before the next file's are started
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.tasks = {}
+
+    def add(self, name, func, args=(), deps=(), soft=()):
+        self.tasks[name] = (func, args, tuple(deps), tuple(soft))
+        return name
+
+    def run(self):
+        """
+        yields (name, ok, message) in the order tasks finish, messages are printed by whoever
+        is looping so only 1 thread ever writes to stdout
+        """
+
+        waiting = {name: set(deps + soft) for name, (func, args, deps, soft) in self.tasks.items()}
+        dependents = defaultdict(list)
+        soft_dependents = defaultdict(list)
+        for name, (func, args, deps, soft) in self.tasks.items():
+            for dep in deps:
+                dependents[dep].append(name)
+            for dep in soft:
+                soft_dependents[dep].append(name)
+
+        order = {name: i for i, name in enumerate(self.tasks)}
+        depth = {}
+        for name, (func, args, deps, soft) in self.tasks.items():
+            # deps are always added before the tasks that need them
+            depth[name] = 1 + max((depth.get(dep, 0) for dep in deps + soft), default=0)
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            running = {}
+            ready = []
+
+            def start(name):
+                del waiting[name]
+                heapq.heappush(ready, (-depth[name], order[name], name))
+
+            def submit():
+                while ready and len(running) < self.workers:
+                    name = heapq.heappop(ready)[2]
+                    func, args, deps, soft = self.tasks[name]
+                    running[pool.submit(func, *args)] = name
+
+            for name in list(waiting):
+                if not waiting[name]:
+                    start(name)
+            submit()
+
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        ok, message = future.result()
+                    except Exception as e:
+                        ok, message = False, 'ERROR: {} failed -- {}'.format(name, e)
+                    yield name, ok, message
+
+                    # a skipped task is done as far as what only waits for it goes
+                    settled = [(name, ok)]
+                    while settled:
+                        name, ok = settled.pop()
+                        for child in soft_dependents[name] + (dependents[name] if ok else []):
+                            if child in waiting:
+                                waiting[child].discard(name)
+                                if not waiting[child]:
+                                    start(child)
+                        for child in dependents[name] if not ok else ():
+                            if waiting.pop(child, None) is not None:
+                                yield child, False, 'Skipping {} -- an earlier step failed'.format(child)
+                                settled.append((child, False))
+                submit()
+
+
+class folder_index:
+    """
+    single os.scandir pass over a subject folder -- every erp_data check reads from this
+    instead of walking the folder again
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # (root, fname) for every file, in os.walk order
+        self.files = []
+        # parse_erp_fname() record for each of self.files
+        self.records = []
+        # fnames directly inside path, what glob(path/*.*) used to return
+        self.top_files = []
+        # (root, fname) => (size, mtime_ns)
+        self.stats = {}
+        # every sub-directory, in os.walk order
+        self.dirs = []
+
+        dirs = [path]
+        while dirs:
+            root = dirs.pop(0)
+            subdirs = []
+            try:
+                with os.scandir(root) as it:
+                    for entry in it:
+                        if entry.is_dir():
+                            self.dirs.append(entry.path)
+                            if not entry.is_symlink():
+                                subdirs.append(entry.path)
+                        else:
+                            self.files.append((root, entry.name))
+                            self.records.append(parse_erp_fname(entry.name))
+                            if root == path:
+                                self.top_files.append(entry.name)
+                            try:
+                                st = entry.stat()
+                                self.stats[(root, entry.name)] = (st.st_size, st.st_mtime_ns)
+                            except OSError:
+                                self.stats[(root, entry.name)] = (0, 0)
+            except OSError:
+                continue
+            # os.walk goes depth first, keep the same order
+            dirs[0:0] = subdirs
+
+    def names(self):
+        """
+        every fname in the folder, sub-directories included
+        """
+        return [n for r,n in self.files]
+
+    def fingerprint(self):
+        """
+        hash of every file's name, size & mtime -- changes whenever the folder does
+        """
+        fp = hashlib.sha1()
+        for r,n in sorted(self.files):
+            size, mtime = self.stats[(r,n)]
+            fp.update("{}\0{}\0{}\n".format(os.path.relpath(os.path.join(r,n), self.path), size, mtime).encode('utf-8', 'surrogateescape'))
+        return fp.hexdigest()
+
+
+class review_cache:
+    """
+    sqlite cache of erp_data review results keyed by folder path & folder fingerprint,
+    so folders that haven't changed since the last review aren't checked again
+    """
+
+    def __init__(self, db_path, version):
+        self.db_path = db_path
+        # bump erp_data.review_version whenever a check changes so old results are ignored
+        self.version = version
+        self.pending = 0
+
+        self.db = sqlite3.connect(db_path, timeout=60)
+        self.db.execute("CREATE TABLE IF NOT EXISTS reviews (path TEXT PRIMARY KEY, version INTEGER, fingerprint TEXT, results TEXT)")
+        self.db.commit()
+
+    def get(self, path):
+        """
+        returns (fingerprint, results) from the last review of path, or None
+        """
+        row = self.db.execute("SELECT fingerprint, results FROM reviews WHERE path = ? AND version = ?", (path, self.version)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, path, fingerprint, results):
+        """
+        stores the results of reviewing path, committed every 100 folders & on close()
+        """
+        self.db.execute("INSERT OR REPLACE INTO reviews VALUES (?, ?, ?, ?)", (path, self.version, fingerprint, json.dumps(results)))
+        self.pending+=1
+        if self.pending >= 100:
+            self.db.commit()
+            self.pending = 0
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+class review_writer:
+    """
+    streams review findings -- 1 row per (folder, check, finding) -- to a csv, jsonl or parquet file
+    """
+
+    columns = ['folder', 'check', 'finding']
+
+    def __init__(self, fname, fmt='csv'):
+        self.fmt = fmt
+        if fmt == 'parquet' and pa is None:
+            print("ERROR: pyarrow isn't installed, writing review table as csv instead")
+            self.fmt = 'csv'
+        if self.fmt not in ('csv', 'jsonl', 'parquet'):
+            print("ERROR: can't export review table as {}, writing csv instead".format(fmt))
+            self.fmt = 'csv'
+        self.fname = '{}.{}'.format(fname, self.fmt)
+        self.rows = 0
+
+        if self.fmt == 'parquet':
+            self.schema = pa.schema([(c, pa.string()) for c in self.columns])
+            self.out = pq.ParquetWriter(self.fname, self.schema)
+            # rows wait here until there's enough for a row group
+            self.batch = []
+        else:
+            self.out = open(self.fname, 'w', newline='')
+            if self.fmt == 'csv':
+                self.csv = csv.writer(self.out)
+                self.csv.writerow(self.columns)
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.rows+=1
+            if self.fmt == 'csv':
+                self.csv.writerow(row)
+            elif self.fmt == 'jsonl':
+                self.out.write(json.dumps(dict(zip(self.columns, row))) + '\n')
+            else:
+                self.batch.append(row)
+        if self.fmt == 'parquet' and len(self.batch) >= 10000:
+            self.flush_batch()
+
+    def flush_batch(self):
+        if self.batch:
+            cols = list(zip(*self.batch))
+            self.out.write_table(pa.Table.from_arrays([pa.array(c, pa.string()) for c in cols], schema=self.schema))
+            self.batch = []
+
+    def close(self):
+        if self.fmt == 'parquet':
+            self.flush_batch()
+        self.out.close()
+
+
+# (exp, ext) => (smallest, largest) sizes measured from site data by erp_data.measure_size_limits
+default_size_limits = os.path.join(os.path.expanduser('~'), '.hbnl_erp', 'size_limits.json')
+
+# settings each avg.h1 was made with, kept by get_h1s next to the avg.h1's -- not a wild file to the review
+h1_manifest_name = '.h1_manifest.json'
+
+
+class erp_data:
+
+    def __init__(self):
+
+        # avg + ps exp names are the same
+        self.avg_and_ps_exps = ['vp3', 'cpt', 'ern', 'ant', 'aod', 'anr', 'stp', 'gng']
+        # number of files associated with avg extension 
+        self.avg_exp_nums = [3,6,4,4,2,2,2,2]
+        # cnt exp names
+        self.cnt_exp_list = ['eeo', 'eec', 'vp3', 'cpt', 'ern', 'ant', 'aod', 'ans', 'stp', 'gng']
+        # versions associated with erp 
+        self.version_list = ['4', '4', '6', '4', '9', '6', '7', '5', '3', '3']
+        # dat exp names 
+        self.dat_exps = ['vp3', 'cpt', 'ern', 'ant', 'aod', 'ans', 'stp', 'gng']
+        # only 1 exp for dat/cnt/ps
+        self.exp_nums_single = [1] * len(self.cnt_exp_list)
+        # (exps, expected number of files, ext) checked by print_missing_exps, in the order they're printed
+        self.count_checks = [(self.avg_and_ps_exps, self.avg_exp_nums, 'avg'),
+                             (self.cnt_exp_list, self.exp_nums_single, 'cnt'),
+                             (self.avg_and_ps_exps, self.exp_nums_single, 'ps'),
+                             (self.dat_exps, self.exp_nums_single, 'dat')]
+        self.count_exps, self.count_exts, self.expected_counts = self.expected_count_matrix()
+        # (exp, ext) => ([smallest, folder], ...), ([largest, folder], ...) believable sizes in bytes, measured from site
+        # data (measure_size_limits). _32.cnt/.avg/.dat files outside the limits measured without their own folder are
+        # flagged in reviews, exps that haven't been measured aren't checked.
+        # DVD-file-size_check.sh stays the size check of the shell scripts tab until this table's been validated
+        self.size_limits, self.size_limits_id = self.load_size_limits(default_size_limits)
+        # whether the last iter_review() has said there's no size_limits table yet
+        self.size_limits_noted = False
+        # file extensions (parse_erp_fname ext) parse_site_data counts
+        self.site_data_exts = ('cnt', 'dat', 'ps', 'avg', 'orig_cnt', 'bad_orig', 'rerun', 'cnt_h1', 'h1', 'h1_ps')
+        # bump when a check's results change so review_cache throws out old results
+        self.review_version = 5
+        # folders answered from review_cache during the last iter_review()
+        self.cache_hits = 0
+        # (folder, exp, ext) file counts & (folder, ext) has any of ext of every folder in the last iter_review() --
+        # built once, each folder's missing experiments & print_site_missing() are read from it
+        self.site_paths = []
+        self.site_rows = {}
+        self.site_observed = np.zeros((0, len(self.count_exps), len(self.count_exts)), dtype=np.int32)
+        self.site_present = np.zeros((0, len(self.count_exts)), dtype=bool)
+
+
+    def check_erp_version(self, path, exp_name, version_num, index=None): 
+        """
+        returns whether ERP experiment version is correct 
+        """
+        self.path = path
+        self.exp_name = exp_name
+        self.version_num = version_num
+
+        if index is None:
+            index = folder_index(path)
+        
+        bad_version = []
+        for (r,n), rec in zip(index.files, index.records):
+            if rec and rec.exp == exp_name and rec.version != version_num:
+                bad_version.append('Check version for {}'.format(n))
+        return bad_version
+
+
+    def iter_check_version(self, path, cnt_exp_list, version_list, index=None):
+        """
+        iterator version of check_erp_version()
+        """
+        self.path = path
+
+        if index is None:
+            index = folder_index(path)
+
+        for exp, version in zip(self.cnt_exp_list, self.version_list):
+            out = self.check_erp_version(path, exp, version, index=index)
+            if len(out) == 0:
+                pass
+            else:
+                return out
+
+
+    def parse_site_data(self, path, index=None):
+        """
+        returns a nested dictionary of common/uncommon file extensions by experiment for a sub
+        """
+        self.path = path
+
+        key = path.split('/')[-1]
+
+        if index is None:
+            index = folder_index(path)
+
+        nested_dict = {}
+        for rec in index.records:
+            if rec and rec.ext in self.site_data_exts:
+                nested_dict.setdefault(key, {}).setdefault(rec.ext, []).append(rec.exp)
+                # newly added -- for 2nd vp3 runs mostly
+                if rec.ext == 'cnt' and rec.session == '2':
+                    nested_dict.setdefault(key, {}).setdefault('rerun', []).append(rec.exp)
+
+        return nested_dict
+
+
+    def remove_wild_files(self, path, index=None):
+        """
+        prompts user to delete file extensions that don't belong in ns folders
+        """
+        self.path = path
+
+        if index is None:
+            index = folder_index(path)
+
+        wild_files = []
+        for (r,n), rec in zip(index.files, index.records):
+            if (rec and rec.ext in ('rerun', 'cnt', 'orig_cnt', 'avg', 'ps', 'dat')) or n.endswith(('txt', 'sub')) or n == h1_manifest_name:
+                pass
+            else:
+                wild_files.append(os.path.join(r,n))
+                    
+        return wild_files
+                    
+
+
+    def load_size_limits(self, fname):
+        """
+        returns ({(exp, ext): (smallest_from, largest_from)}, id of the table for review_folder's fingerprint) from
+        a save_size_limits file -- an empty table if there isn't one
+        """
+        self.fname = fname
+
+        if not os.path.exists(fname):
+            return {}, ''
+        with open(fname, 'rb') as f:
+            raw = f.read()
+        limits = {}
+        for row in json.loads(raw.decode()):
+            # tables measured before limits were kept by folder only have the overall ones
+            limits[(row['exp'], row['ext'])] = (row.get('smallest_from', [[row['smallest'], None]]),
+                                                row.get('largest_from', [[row['largest'], None]]))
+        return limits, hashlib.sha1(raw).hexdigest()
+
+
+    def measure_size_limits(self, subject_dirs, margin=0.5, min_files=20):
+        """
+        sizes of every _32.cnt, .avg & .dat file in subject_dirs by (exp, ext) -- returns a row per (exp, ext)
+        seen in at least min_files files, with limits margin below the smallest & above the largest size found.
+        smallest_from/largest_from are the limits the 2 folders with the smallest/largest files give, so a
+        folder can be checked against what the rest of the site measures
+        """
+        self.subject_dirs = subject_dirs
+
+        sizes = defaultdict(lambda: defaultdict(list))
+        for i in subject_dirs:
+            index = folder_index(i)
+            folder = os.path.realpath(i)
+            for (r,n), rec in zip(index.files, index.records):
+                if rec and rec.ext in ('cnt', 'avg', 'dat'):
+                    sizes[(rec.exp, rec.ext)][folder].append(index.stats[(r,n)][0])
+
+        rows = []
+        for (exp, ext), by_folder in sorted(sizes.items()):
+            found = [size for folder_sizes in by_folder.values() for size in folder_sizes]
+            if len(found) < min_files:
+                continue
+            smallest = sorted((min(v), k) for k, v in by_folder.items())[:2]
+            largest = sorted(((max(v), k) for k, v in by_folder.items()), reverse=True)[:2]
+            rows.append({'exp': exp, 'ext': ext, 'files': len(found), 'min_found': min(found), 'max_found': max(found),
+                         'smallest': int(min(found) * (1 - margin)), 'largest': int(max(found) * (1 + margin)),
+                         'smallest_from': [[int(size * (1 - margin)), folder] for size, folder in smallest],
+                         'largest_from': [[int(size * (1 + margin)), folder] for size, folder in largest]})
+        return rows
+
+
+    def save_size_limits(self, rows, fname):
+        """
+        writes measure_size_limits rows where load_size_limits reads them from
+        """
+        self.fname = fname
+
+        os.makedirs(os.path.dirname(fname) or '.', exist_ok=True)
+        with open(fname, 'w') as f:
+            json.dump(rows, f, indent=1)
+
+
+    def folder_size_limits(self, path):
+        """
+        (exp, ext) => (smallest, largest) path's files are checked against -- measured from every other folder,
+        so an odd sized file can't widen its own limits. exps only measured in path aren't checked
+        """
+        self.path = path
+
+        folder = os.path.realpath(path)
+        limits = {}
+        for key, (smallest_from, largest_from) in self.size_limits.items():
+            smallest = [size for size, measured in smallest_from if measured != folder]
+            largest = [size for size, measured in largest_from if measured != folder]
+            if smallest and largest:
+                limits[key] = (smallest[0], largest[0])
+        return limits
+
+
+    def check_file_sizes(self, path, index=None):
+        """
+        flags _32.cnt, .avg & .dat files whose size is outside their (exp, ext)'s folder_size_limits -- sizes come from the folder index
+        """
+        self.path = path
+
+        if index is None:
+            index = folder_index(path)
+
+        limits = self.folder_size_limits(path)
+        bad_sizes = []
+        for (r,n), rec in zip(index.files, index.records):
+            if not rec or (rec.exp, rec.ext) not in limits:
+                continue
+            smallest, largest = limits[(rec.exp, rec.ext)]
+            size = index.stats[(r,n)][0]
+            if size < smallest:
+                bad_sizes.append('Truncated file {} ({} bytes, expected at least {})'.format(os.path.join(r,n), size, smallest))
+            elif size > largest:
+                bad_sizes.append('Oversized file {} ({} bytes, expected at most {})'.format(os.path.join(r,n), size, largest))
+        return bad_sizes
+
+
+    def get_ext_count(self, path, nested_dict, ext_type, exp_name, number_files):
+        """
+        checks nested dictionary for number of extensions associated with each experiment
+        e.g. checks that there's 6 CPT avg files or 1 EEC cnt file...
+        """
+
+        self.path = path
+        self.nested_dict = nested_dict
+        self.ext_type = ext_type
+        self.exp_name = exp_name
+        self.number_files = number_files
+
+        missing_files = []
+        for k,v in nested_dict.items():
+            for k1, v1 in v.items():
+                if ext_type == k1:
+                    num_files = v1.count(exp_name)
+                    if num_files != number_files:
+                        missing_files.append('Incorrect number of {} {} files in {}'.format(exp_name, ext_type, path))
+        return missing_files
+
+    # get_ext_count()
+    def iter_exps(self, path, nested_dict, exp_list, exp_list_avgs, ext_type):
+        """
+        iterator version of iter_exps()
+        """
+        self.path = path
+        self.exp_list = exp_list
+        self.exp_list_avgs = exp_list_avgs
+        self.ext_type = ext_type
+        
+        new_lst = []
+        for exp, avg_nums in zip(exp_list, exp_list_avgs):
+            new_lst.extend(self.get_ext_count(path, nested_dict, ext_type, exp, avg_nums))
+        if len(new_lst) == 0:
+            pass
+        else:
+            return new_lst
+
+
+
+    def check_id_and_run(self, path, index=None):
+        """
+        checks to see if important file extensions have same sub ID & run letter
+        """
+        self.path = path
+
+        folder = path.split('/')[-1]
+
+        if index is None:
+            index = folder_index(path)
+
+        sub_id_list = []
+        run_letter_list = []
+
+        # same files glob(path/*.*) would return
+        for fname in index.top_files:
+            if '.' not in fname or fname.startswith('.'):
+                continue
+            rec = parse_erp_fname(fname)
+            if rec and rec.ext in ('cnt', 'orig_cnt', 'ps', 'avg', 'dat'):
+                sub_id_list.append(rec.sub_id)
+                # append run letters 
+                run_letter_list.append(rec.run)
+
+
+        unique_ids = list(set(sub_id_list))
+        unique_run_letters = list(set(run_letter_list))
+
+        if  len(unique_ids) > 1:
+            return str("Folder {} has more than one sub ID => {}".format(folder, unique_ids))
+
+        if len(unique_run_letters) > 1:
+            return str("Folder {} has more than one run letter => {}".format(folder, unique_run_letters))
+
+
+    def print_erp_version(self, path, cnt_exp_list, version_list, index=None, results=None):
+        """
+        check erp version 
+        """
+
+        self.path = path
+
+        print('\n\nERP VERSION CHECK:')
+
+        if results is None:
+            iter_check = self.iter_check_version(path, self.cnt_exp_list, self.version_list, index=index)
+        else:
+            iter_check = results['versions'] or None
+        if  iter_check is None:
+            print('All versions check out!')
+        else:
+            for i in iter_check:
+                print(i)
+
+
+    def print_file_counts(self, nested_data_dict):
+        """
+        returns counts of file extensions
+        """
+
+        self.nested_data_dict = nested_data_dict
+
+        print('\n\nFILES COUNT:')
+        for k,v in nested_data_dict.items():
+            for k1,v1 in v.items():
+                print("There are {} {} files".format(len(v1), k1.upper()))
+
+
+    def expected_count_matrix(self):
+        """
+        compiles count_checks into 1 (exp x ext) matrix of expected file counts, -1 where a pair isn't checked.
+        exps are merged so every list keeps its own order
+        """
+
+        exps = []
+        for exp_list, nums, ext in self.count_checks:
+            for n, exp in enumerate(exp_list):
+                if exp not in exps:
+                    exps.insert(exps.index(exp_list[n-1]) + 1 if n else 0, exp)
+        exts = [ext for exp_list, nums, ext in self.count_checks]
+
+        expected = np.full((len(exps), len(exts)), -1, dtype=np.int32)
+        for exp_list, nums, ext in self.count_checks:
+            for exp, num in zip(exp_list, nums):
+                expected[exps.index(exp), exts.index(ext)] = num
+        return exps, exts, expected
+
+
+    def observed_count_matrix(self, nested_data_dicts):
+        """
+        counts files by (folder, exp, ext) for a list of parse_site_data() dicts in 1 pass.
+        also returns which exts each folder has at all -- an ext that isn't there at all isn't checked
+        """
+
+        exp_pos = {exp: i for i, exp in enumerate(self.count_exps)}
+        ext_pos = {ext: j for j, ext in enumerate(self.count_exts)}
+
+        observed = np.zeros((len(nested_data_dicts), len(self.count_exps), len(self.count_exts)), dtype=np.int32)
+        present = np.zeros((len(nested_data_dicts), len(self.count_exts)), dtype=bool)
+        folders, rows, cols = [], [], []
+        for f, nested_dict in enumerate(nested_data_dicts):
+            for k,v in nested_dict.items():
+                for ext, exps in v.items():
+                    if ext not in ext_pos:
+                        continue
+                    present[f, ext_pos[ext]] = True
+                    for exp in exps:
+                        if exp in exp_pos:
+                            folders.append(f)
+                            rows.append(exp_pos[exp])
+                            cols.append(ext_pos[ext])
+        np.add.at(observed, (folders, rows, cols), 1)
+        return observed, present
+
+
+    def missing_exps_table(self, paths, nested_data_dicts):
+        """
+        compares every folder's counts with expected_counts at once.
+        returns rows of (folder, exp, ext, expected, observed) for every count that's off,
+        in the order print_missing_exps prints them
+        """
+
+        observed, present = self.observed_count_matrix(nested_data_dicts)
+        return self.missing_rows(paths, observed, present)
+
+
+    def start_site_table(self, paths):
+        """
+        empty site table with a row for every folder in paths, filled in by add_to_site_table
+        """
+        self.paths = paths
+
+        self.site_paths = list(paths)
+        self.site_rows = {path: f for f, path in enumerate(self.site_paths)}
+        self.site_observed = np.zeros((len(self.site_paths), len(self.count_exps), len(self.count_exts)), dtype=np.int32)
+        self.site_present = np.zeros((len(self.site_paths), len(self.count_exts)), dtype=bool)
+
+
+    def add_to_site_table(self, path, nested_data_dict):
+        """
+        counts 1 reviewed folder's parse_site_data() into its row of the site table
+        """
+        self.path = path
+
+        observed, present = self.observed_count_matrix([nested_data_dict])
+        f = self.site_rows[path]
+        self.site_observed[f] = observed[0]
+        self.site_present[f] = present[0]
+
+
+    def site_missing(self, paths=None):
+        """
+        missing_exps_table rows of paths (every folder if None) read from the site table
+        """
+
+        rows = list(range(len(self.site_paths))) if paths is None else [self.site_rows[i] for i in paths]
+        return self.missing_rows([self.site_paths[f] for f in rows], self.site_observed[rows], self.site_present[rows])
+
+
+    def missing_rows(self, paths, observed, present):
+        """
+        (folder, exp, ext, expected, observed) of every count in observed that's off
+        """
+
+        expected = self.expected_counts[np.newaxis]
+        wrong = (observed != expected) & (expected >= 0) & present[:, np.newaxis, :]
+
+        # sort by folder, then ext, then exp
+        f, e, x = np.nonzero(wrong)
+        order = np.lexsort((e, x, f))
+        return [(paths[f[i]], self.count_exps[e[i]], self.count_exts[x[i]], int(self.expected_counts[e[i], x[i]]), int(observed[f[i], e[i], x[i]]))
+                for i in order]
+
+
+    def print_missing_exps(self, path, nested_data_dict, missing=None):
+        """
+        returns file type that's missing, if any. missing is path's rows of the site table when there is one
+        """
+        self.path = path
+        self.nested_data_dict = nested_data_dict
+
+        print('\n\nMissing Experiments:')
+
+        if missing is None:
+            missing = self.missing_exps_table([path], [nested_data_dict])
+        for ext in self.count_exts:
+            ext_missing = [row for row in missing if row[2] == ext]
+            if len(ext_missing) == 0:
+                print('All {} files found!'.format(ext))
+            else:
+                for folder, exp, ext, expected, observed in ext_missing:
+                    print('Incorrect number of {} {} files in {}'.format(exp, ext, folder))
+                print('\n')
+
+
+    def print_site_missing(self, paths):
+        """
+        summary of missing experiments over every folder reviewed, from the site table
+        """
+        self.paths = paths
+
+        missing = self.site_missing(paths)
+        bad_folders = len(set(row[0] for row in missing))
+
+        print('\n\nSITE SUMMARY -- MISSING EXPERIMENTS:')
+        if len(missing) == 0:
+            print('All files found in all {} folders!'.format(len(paths)))
+            return
+        print('{} of {} folders have an incorrect number of files'.format(bad_folders, len(paths)))
+        for (exp, ext), n in Counter((row[1], row[2]) for row in missing).most_common():
+            print('{} {} => {} folders'.format(exp, ext, n))
+
+
+    def print_wild_files(self, path, index=None, results=None):
+        """
+        returns files that don't belong
+        """
+        self.path = path
+        
+        if results is None:
+            wild_files =  self.remove_wild_files(path, index=index)
+        else:
+            wild_files = results['wild_files']
+        
+        print("\n\nFILES THAT DON'T BELONG IN NS FOLDERS:")
+        if len(wild_files) == 0:
+            print('No wild files found!')
+        else:
+            for i in wild_files:
+                print(i)
+
+
+    def print_file_sizes(self, path, index=None, results=None):
+        """
+        returns files that are too small or too big
+        """
+        self.path = path
+
+        if results is None:
+            bad_sizes = self.check_file_sizes(path, index=index)
+        else:
+            bad_sizes = results['sizes']
+
+        if not self.size_limits:
+            # said once per review, not in every folder's report
+            if not self.size_limits_noted:
+                print('\n\nFILE SIZE CHECK:')
+                print('No measured size limits in {} -- sizes are only checked by DVD-file-size_check.sh'.format(default_size_limits))
+                self.size_limits_noted = True
+            return
+
+        print('\n\nFILE SIZE CHECK:')
+        if len(bad_sizes) == 0:
+            print('All file sizes check out!')
+        else:
+            for i in bad_sizes:
+                print(i)
+
+
+    def print_id_and_letter(self, path, index=None, results=None):
+        """
+        returns ID & run letter, should both be unique
+        """
+        self.path = path
+
+        print('\n\nCHECK SUBJECT ID & RUN LETTER:')
+
+        if results is None:
+            id_and_run = self.check_id_and_run(path, index=index)
+        else:
+            id_and_run = results['id_and_run']
+        if id_and_run is None:
+            print('All IDs & run letters check out!')
+        else:
+            print(id_and_run)
+
+
+    def review_results(self, path, index=None):
+        """
+        returns the results of every check on a folder as plain lists/dicts (what review_cache stores)
+        """
+        self.path = path
+
+        # one pass over the folder, every check below reads from it
+        if index is None:
+            index = folder_index(path)
+
+        results = {}
+        results['versions'] = self.iter_check_version(path, self.cnt_exp_list, self.version_list, index=index) or []
+        results['wild_files'] = self.remove_wild_files(path, index=index)
+        results['sizes'] = self.check_file_sizes(path, index=index)
+        results['site_data'] = self.parse_site_data(path, index=index)
+        results['id_and_run'] = self.check_id_and_run(path, index=index)
+        return results
+
+
+    def run_all(self, path, results=None, missing=None):
+        """
+        2nd to last step. missing is path's rows of the site table, when there is one
+        """
+        self.path = path
+
+        if results is None:
+            results = self.review_results(path)
+        nested_data_dict = results['site_data']
+
+        self.print_erp_version(path, self.cnt_exp_list, self.version_list, results=results)
+        self.print_wild_files(path, results=results)
+        self.print_file_sizes(path, results=results)
+        self.print_file_counts(nested_data_dict)
+        self.print_missing_exps(path, nested_data_dict, missing)
+        self.print_id_and_letter(path, results=results)
+
+
+    def plan_review(self, path):
+        """
+        returns every subject folder (directory with no sub-directories) under path, found in 1 walk.
+        path itself is returned if it's already a subject folder
+        """
+        self.path = path
+
+        subject_dirs = []
+        dirs = [path]
+        while dirs:
+            root = dirs.pop(0)
+            subdirs = []
+            try:
+                with os.scandir(root) as it:
+                    for entry in it:
+                        if entry.is_dir() and not entry.is_symlink():
+                            subdirs.append(entry.path)
+            except OSError:
+                continue
+            if len(subdirs) == 0:
+                subject_dirs.append(root)
+            dirs[0:0] = sorted(subdirs)
+
+        return subject_dirs
+
+
+    def execute_all(self, path, workers=1, cache=None, writer=None):
+        """
+        last step -- reviews each subject folder under path exactly once
+        """
+
+        self.path = path
+
+        subject_dirs = self.plan_review(path)
+        print("\n\n>>> {} FOLDERS TO REVIEW <<<".format(len(subject_dirs)))
+
+        count=0
+        for i, report in zip(subject_dirs, self.iter_review(subject_dirs, workers, cache, writer)):
+            count+=1
+            print("\n\n{} || {}".format(count, i))
+            print(report, end='')
+
+        self.print_site_missing(subject_dirs)
+
+
+    def review_findings(self, path, results, missing=None):
+        """
+        returns results of reviewing 1 folder as (folder, check, finding) rows -- 'ok' if a check found nothing.
+        missing is path's rows of the site table, when there is one
+        """
+        self.path = path
+
+        if results is None:
+            return [(path, 'error', "folder couldn't be reviewed")]
+
+        rows = []
+        rows.extend((path, 'version', i) for i in results['versions'])
+        rows.extend((path, 'wild_files', i) for i in results['wild_files'])
+        rows.extend((path, 'file_size', i) for i in results['sizes'])
+        if missing is None:
+            missing = self.missing_exps_table([path], [results['site_data']])
+        for folder, exp, ext, expected, observed in missing:
+            rows.append((path, 'missing_exps', '{} {} files: expected {}, found {}'.format(exp, ext, expected, observed)))
+        if results['id_and_run']:
+            rows.append((path, 'id_and_run', results['id_and_run']))
+
+        checked = set(row[1] for row in rows)
+        for check in ('version', 'wild_files', 'file_size', 'missing_exps', 'id_and_run'):
+            if check not in checked:
+                rows.append((path, check, 'ok'))
+        return rows
+
+
+    def iter_review(self, subject_dirs, workers=1, cache=None, writer=None, ahead=2):
+        """
+        yields the run_all() report of each folder, in folder order. every folder's file counts go in 1 site
+        table as they come in, each report's missing experiments & print_site_missing() are read from it.
+        workers > 1 reviews the folders on a pool of worker processes, 1 worker lists the next ahead folders
+        while it reviews the current one.
+        with a review_cache, folders that haven't changed are answered from the cache.
+        with a review_writer, each folder's findings are written out as it's reviewed
+        """
+        self.subject_dirs = subject_dirs
+        self.cache_hits = 0
+        self.size_limits_noted = False
+        self.start_site_table(subject_dirs)
+
+        # cache is only read & written here, workers just get handed the last results
+        cached = [cache.get(i) if cache else None for i in subject_dirs]
+
+        if workers <= 1 or len(subject_dirs) <= 1:
+            reviewed = map(review_folder, prefetch_folders(subject_dirs, ahead), cached)
+            for i, (printed, fingerprint, results, hit) in zip(subject_dirs, reviewed):
+                yield printed + self.collect_review(i, fingerprint, results, hit, cache, writer)
+            return
+
+        # not fork -- the GUI calls this with Qt & maybe an H1 run's threads going, & forking a threaded process
+        # isn't safe. not forkserver either, its server imports from whatever folder it was started in. spawned
+        # workers get this process's sys.path, so they import the same erpTools it did
+        ctx = multiprocessing.get_context('spawn')
+        chunksize = max(1, min(16, len(subject_dirs) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            reviewed = pool.map(review_folder, subject_dirs, cached, chunksize=chunksize)
+            for i, (printed, fingerprint, results, hit) in zip(subject_dirs, reviewed):
+                yield printed + self.collect_review(i, fingerprint, results, hit, cache, writer)
+
+
+    def collect_review(self, path, fingerprint, results, hit, cache=None, writer=None):
+        """
+        adds a folder's counts to the site table, keeps count of cache hits, stores results of folders that
+        had to be reviewed & exports findings. returns the folder's run_all() report
+        """
+        if results is None:
+            if writer:
+                writer.write_rows(self.review_findings(path, results))
+            return ''
+
+        self.add_to_site_table(path, results['site_data'])
+        missing = self.site_missing([path])
+        if writer:
+            writer.write_rows(self.review_findings(path, results, missing))
+        if hit:
+            self.cache_hits+=1
+        elif cache:
+            cache.put(path, fingerprint, results)
+
+        report = io.StringIO()
+        with getattr(sys.stdout, 'redirect', redirect_stdout)(report):
+            try:
+                self.run_all(path, results=results, missing=missing)
+            except Exception as e:
+                print("\n\nERROR: couldn't review {} => {}".format(path, repr(e)))
+        return report.getvalue()
+                
+
+    # anything below here doesn't get executed in execute_all()
+    def shell_check_results(self, path, timeout=None):
+        """
+        runs David's ERP shell scripts on 1 folder, returns their output & exit codes
+        """
+
+        erp_code, erp_out, erp_err, erp_timed_out = run_tool(['ERP-raw-data_check.sh', path], cwd=path, timeout=timeout)
+        size_code, size_out, size_err, size_timed_out = run_tool(['DVD-file-size_check.sh', path], cwd=path, timeout=timeout)
+        # a script that couldn't be started (run_tool's 126/127) says why instead of nothing
+        if erp_code in (126, 127) and not erp_out:
+            erp_out = erp_err
+        if size_code in (126, 127) and not size_out:
+            size_out = size_err
+
+        return {'folder': path,
+                'erp_check': erp_out, 'erp_check_code': erp_code, 'erp_check_timed_out': erp_timed_out,
+                'size_check': size_out, 'size_check_code': size_code, 'size_check_timed_out': size_timed_out}
+
+
+    def print_shell_check(self, check):
+        """
+        prints shell_check_results() the way the shell scripts tab always has
+        """
+
+        print("\nERP CHECK: {} {}".format(check['folder'], check['erp_check']))
+        if check['erp_check_timed_out']:
+            print("ERROR: ERP-raw-data_check.sh timed out on {}".format(check['folder']))
+        if check['size_check_timed_out']:
+            print("ERROR: DVD-file-size_check.sh timed out on {}".format(check['folder']))
+        print('FILE SIZE CHECK: {} {}\n'.format(check['folder'], check['size_check']))
+
+
+    def shell_filesize_check(self, path, timeout=None):
+        """
+        return stdout & stderr from David's ERP shell scripts
+        """
+        self.path = path
+
+        check = self.shell_check_results(path, timeout)
+        self.print_shell_check(check)
+        return check
+
+
+    def iter_shell_results(self, subject_dirs, workers=1, timeout=None):
+        """
+        yields shell_check_results() of each folder in folder order, running up to workers folders at once
+        """
+        self.subject_dirs = subject_dirs
+
+        if workers <= 1:
+            for i in subject_dirs:
+                yield self.shell_check_results(i, timeout)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for check in pool.map(functools.partial(self.shell_check_results, timeout=timeout), subject_dirs):
+                yield check
+
+
+    def iter_shell_check(self, path, workers=1, timeout=None):
+        """
+        iterate over subject folders checking with shell scripts, returns each shell_check_results()
+        """
+
+        self.path = path
+
+        subject_dirs = self.plan_review(path)
+        checks = []
+        count=0
+        for i, check in zip(subject_dirs, self.iter_shell_results(subject_dirs, workers, timeout)):
+            count+=1
+            print("\n{} || {}".format(count, i))
+            self.print_shell_check(check)
+            checks.append(check)
+        return checks
+
+
+ep = erp_data()
+
+
+def review_folder(path, cached=None):
+    """
+    reviews 1 folder -- run_all()'s report is made from the results by iter_review, once the folder's in the site table.
+    cached is (fingerprint, results) from review_cache -- reused if the folder hasn't changed.
+    returns (anything printed while reviewing, fingerprint, results, cache hit)
+    """
+
+    report = io.StringIO()
+    fingerprint, results, hit = None, None, False
+    # the GUI's stdout redirects just this thread, so an H1 run going at the same time doesn't print into the report
+    with getattr(sys.stdout, 'redirect', redirect_stdout)(report):
+        try:
+            index = folder_index(path)
+            # a new size_limits table changes the file size findings too
+            fingerprint = index.fingerprint() + ep.size_limits_id
+            if cached is not None and cached[0] == fingerprint:
+                results, hit = cached[1], True
+            else:
+                results = ep.review_results(path, index=index)
+        except Exception as e:
+            print("\n\nERROR: couldn't review {} => {}".format(path, repr(e)))
+    return report.getvalue(), fingerprint, results, hit
+
+
+################################### NEW CLASS STARTS HERE ###################################
+
+# where get_h1s keeps avg.h1's it has made before & how big that's allowed to get
+default_h1_store = os.path.join(os.path.expanduser('~'), '.hbnl_erp', 'h1_store')
+default_h1_store_cap = 20e9
+
+
+class h1_store:
+    """
+    content addressed store of avg.h1 files keyed by the file they were made from (hash & name), the tools &
+    their settings. file hashes are kept in sqlite by path, size & mtime so an unchanged cnt is only read once.
+    the store keeps its own copies -- nothing outside it shares an inode with them -- & the least recently used
+    ones are thrown out once they add up to more than cap bytes
+    """
+
+    def __init__(self, root=default_h1_store, cap=default_h1_store_cap):
+        self.root = root
+        self.cap = cap
+        os.makedirs(root, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(root, 'hashes.db'), timeout=60, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS hashes (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha TEXT)")
+        tracked = self.db.execute("SELECT name FROM sqlite_master WHERE name = 'entries'").fetchone()
+        self.db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, size INTEGER, used REAL)")
+        if not tracked:
+            # store made before entries were tracked, everything in it counts as used when it was stored
+            for r,d,f in os.walk(root):
+                for n in f:
+                    if n.endswith('_avg.h1'):
+                        st = os.stat(os.path.join(r,n))
+                        self.db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (n[:-len('_avg.h1')], st.st_size, st.st_mtime))
+        self.db.commit()
+        self.evict()
+
+    def cached_hash(self, path):
+        """
+        sha256 of path from the last time it was hashed, None if it changed since or never was
+        """
+
+        st = os.stat(path)
+        with self.lock:
+            row = self.db.execute("SELECT sha FROM hashes WHERE path = ? AND size = ? AND mtime_ns = ?", (path, st.st_size, st.st_mtime_ns)).fetchone()
+        return row[0] if row else None
+
+    def file_hash(self, path):
+        """
+        sha256 of path's contents, only read if path changed since it was last hashed
+        """
+
+        cached = self.cached_hash(path)
+        if cached:
+            return cached
+
+        st = os.stat(path)
+
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(functools.partial(f.read, 1 << 20), b''):
+                sha.update(chunk)
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)", (path, st.st_size, st.st_mtime_ns, sha.hexdigest()))
+            self.db.commit()
+        return sha.hexdigest()
+
+    def key(self, sha, name, tools, params):
+        return hashlib.sha256(json.dumps([sha, name, tools, params]).encode()).hexdigest()
+
+    def stored(self, key):
+        return os.path.join(self.root, key[:2], key + '_avg.h1')
+
+    def fetch(self, key, target):
+        """
+        copies the avg.h1 stored under key to target as a new file of target's own, False if there isn't one
+        """
+
+        stored = self.stored(key)
+        if not os.path.exists(stored):
+            return False
+        if os.path.lexists(target):
+            os.remove(target)
+        # not keeping the stored file's mtime, so up to date checks see it as made now
+        copy_file(stored, target, keep_stat=False)
+        with self.lock:
+            self.db.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+        return True
+
+    def put(self, key, made):
+        """
+        stores a copy of a freshly made avg.h1 under key (made itself is left as it is), then evicts
+        """
+
+        stored = self.stored(key)
+        if os.path.exists(stored):
+            return
+        os.makedirs(os.path.dirname(stored), exist_ok=True)
+        size = copy_file(made, stored)
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, size, time.time()))
+            self.db.commit()
+        self.evict()
+
+    def evict(self):
+        """
+        removes the least recently used avg.h1's until the store's no bigger than cap
+        """
+
+        with self.lock:
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.cap:
+                return
+            for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY used").fetchall():
+                if total <= self.cap:
+                    break
+                if os.path.exists(self.stored(key)):
+                    os.remove(self.stored(key))
+                self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total-=size
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+# what the last batch of get_h1s runs finished, so an interrupted batch can be resumed
+default_h1_journal = os.path.join(os.path.expanduser('~'), '.hbnl_erp', 'h1_journal.jsonl')
+
+
+class h1_journal:
+    """
+    JSON lines checkpoint of 1 batch of get_h1s runs -- the folders & settings, every step as it starts & finishes
+    & every folder once it's done. each line is fsync'd before the step goes on, so a step that started but
+    never finished (crash, GUI closed) means its outputs may be partly written
+    """
+
+    def __init__(self, path=default_h1_journal):
+        self.path = path
+        self.lock = threading.Lock()
+        self.f = None
+        self.batch = None
+        self.running = {}
+        self.done_folders = set()
+
+    def start(self, folders, h1_args):
+        """
+        starts the journal of a new batch over folders, forgetting the last one
+        """
+
+        self.batch = {'folders': list(folders), 'h1_args': dict(h1_args, set_of_exps=sorted(h1_args['set_of_exps']))}
+        self.running, self.done_folders = {}, set()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.f = open(self.path, 'w')
+        except OSError as e:
+            print("ERROR: can't write the h1 journal, this run can't be resumed -- {}".format(e))
+            return
+        self.write(event='batch', **self.batch)
+
+    def resume(self):
+        """
+        reopens the last batch's journal, returns (folders not done yet, get_h1s arguments) or None if there isn't one
+        """
+
+        try:
+            line = ''
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        # last line cut off by the crash
+                        continue
+                    if row['event'] == 'batch':
+                        self.batch = {'folders': row['folders'], 'h1_args': row['h1_args']}
+                    elif row['event'] == 'started':
+                        self.running[(row['stem'], row['step'])] = (row['folder'], row['outputs'])
+                    elif row['event'] == 'finished':
+                        self.running.pop((row['stem'], row['step']), None)
+                    elif row['event'] == 'cleared':
+                        self.running = {k: v for k, v in self.running.items() if v[0] != row['folder']}
+                    elif row['event'] == 'folder':
+                        self.done_folders.add(row['folder'])
+            self.f = open(self.path, 'a')
+            # rows go after the line the crash cut off, not onto the end of it
+            if line and not line.endswith('\n'):
+                self.f.write('\n')
+        except OSError:
+            return None
+        if self.batch is None:
+            return None
+
+        h1_args = dict(self.batch['h1_args'], set_of_exps=set(self.batch['h1_args']['set_of_exps']))
+        return [i for i in self.batch['folders'] if i not in self.done_folders], h1_args
+
+    def write(self, **row):
+        if self.f is None:
+            return
+        with self.lock:
+            self.f.write(json.dumps(row) + '\n')
+            self.f.flush()
+            os.fsync(self.f.fileno())
+
+    def step_started(self, folder, stem, step, outputs):
+        with self.lock:
+            self.running[(stem, step)] = (folder, outputs)
+        self.write(event='started', folder=folder, stem=stem, step=step, outputs=outputs)
+
+    def step_finished(self, folder, stem, step):
+        with self.lock:
+            self.running.pop((stem, step), None)
+        self.write(event='finished', folder=folder, stem=stem, step=step)
+
+    def folder_done(self, folder):
+        self.done_folders.add(folder)
+        self.write(event='folder', folder=folder)
+
+    def clear_partial(self, folder):
+        """
+        outputs of folder's steps that started & never finished, forgotten once returned since
+        whoever asks removes them before folder is worked on again
+        """
+
+        with self.lock:
+            partial = {step: outputs for step, (f, outputs) in self.running.items() if f == folder}
+            for step in partial:
+                del self.running[step]
+        if partial:
+            self.write(event='cleared', folder=folder)
+        return sorted(o for outputs in partial.values() for o in outputs)
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+
+class scratch_space:
+    """
+    folder on local disk (or /dev/shm) 1 get_h1s call does its copy => cnt.h1 => avg.h1 work in, removed once the
+    call's done. a cnt only goes in while what's taken & not given back yet stays under cap bytes (default 90% of
+    the free space), so cap is the most that's ever in scratch at once
+    """
+
+    def __init__(self, root, cap=None):
+        self.root = root
+        self.cap = cap if cap is not None else 0.9 * shutil.disk_usage(root).free
+        self.folder = tempfile.mkdtemp(prefix='get_h1s_', dir=root)
+        self.lock = threading.Lock()
+        self.used = 0
+
+    def take(self, size):
+        """
+        claims size bytes, False if that would go over cap
+        """
+
+        with self.lock:
+            if self.used + size > self.cap:
+                return False
+            self.used+=size
+            return True
+
+    def give_back(self, size):
+        """
+        returns size bytes of what was taken once the files they were for are gone
+        """
+
+        with self.lock:
+            self.used = max(0, self.used - size)
+
+    def remove(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+
+# 1 cnt file's trip through get_h1s -- stem is the output path minus extension, src the cnt to copy
+# (None when working in place) & start the first step it needs
+h1_job = namedtuple('h1_job', ['exp', 'src', 'stem', 'start'])
+
+# 1 step of 1 job in plan_get_h1s -- status is run, up to date or h1 store
+h1_plan_step = namedtuple('h1_plan_step', ['stem', 'step', 'command', 'inputs', 'outputs', 'status'])
+
+
+class site_data:
+    #get_h1s()
+    def __init__(self):
+    
+        self.ant_set = {'ant'}
+        self.ans_set = {'ans'}
+        self.other_exps = {'vp3', 'cpt', 'ern', 'aod', 'stp', 'gng'}
+
+        # create_avghdf1_from_cnthdf1X settings by exp, exps not in here stop at cnt.h1
+        self.avgh1_params = {}
+        for exps, params in ((self.ant_set, '-lpfilter 8 -hpfilter 0.03 -thresh 75 -baseline_times -125 0'),
+                             (self.ans_set, '-lpfilter 16 -hpfilter 0.03 -thresh 100 -baseline_times -125 0'),
+                             (self.other_exps, '-lpfilter 16 -hpfilter 0.03 -thresh 75 -baseline_times -125 0')):
+            self.avgh1_params.update(dict.fromkeys(exps, params.split()))
+
+        # plot_hdf1_data.sh runs allowed at once, seconds before 1 is killed & how each plot went
+        self.ps_slots = threading.BoundedSemaphore(4)
+        self.ps_timeout = None
+        self.ps_results = []
+
+        # steps a cnt file goes through in get_h1s, in order, & the file each makes (added to the job's stem)
+        self.h1_steps = {'fetch': self.fetch_avgh1, 'copy': self.stage_cnt, 'cnt_h1': self.make_cnth1, 'avg_h1': self.make_avgh1,
+                         'ps': self.make_ps, 'cleanup': self.remove_h1_inputs}
+        self.h1_outputs = {'copy': '_32.cnt', 'cnt_h1': '_cnt.h1', 'avg_h1': '_avg.h1', 'ps': '_avg.h1.ps'}
+        self.h1_tools = {'cnt_h1': 'create_cnthdf1_from_cntneuroX.sh', 'avg_h1': 'create_avghdf1_from_cnthdf1X', 'ps': 'plot_hdf1_data.sh'}
+        self.metrics = metrics
+
+        # tools that take several input files in 1 run -- get_h1s runs these once per batch of files in a folder
+        # (split over the workers & kept under ARG_MAX) instead of once per file. cnts whose file a batch didn't make
+        self.batch_tools = set()
+        self.batch_failed = set()
+        # cnts that had a step fail or skipped -- a batch waits for all of its cnts' earlier steps & leaves these out
+        self.failed_jobs = set()
+
+        # sidecar in every folder avg.h1's are made in => {avg.h1 name: settings it was made with}
+        self.h1_manifest = h1_manifest_name
+        self.manifests = {}
+        self.made_with = {}
+
+        # where get_h1s sends tool output lines as they come, None to only print them when a step ends
+        self.stream = None
+
+        # h1_store get_h1s is using, the store key of each job & jobs whose avg.h1 came out of it
+        self.store = None
+        self.store_keys = {}
+        self.fetched = set()
+
+        # h1_journal get_h1s checkpoints every step in, None when it's not part of a batch
+        self.journal = None
+
+        # scratch_space get_h1s stages copied cnts in, the stem each staged job is worked on under & the steps
+        # that worked there -- only their files are moved to the target dir once the folder's done. scratch_taken
+        # is what each staged job has taken of scratch & not given back yet
+        self.scratch = None
+        self.work_stems = {}
+        self.scratch_made = defaultdict(set)
+        self.scratch_taken = {}
+                
+    def check_cnt_copy(self, path, exp_tuple, names=None):
+        """
+        checks to see if files you want to h1 are actually in the directory to begin with,
+        names are checked instead of walking path if they're given
+        """
+
+        self.path = path
+        self.exp_tuple = exp_tuple
+
+        if names is None:
+            names = [n for r,d,f in os.walk(path) for n in f]
+
+        cnt_dict = {}
+        for n in names:
+            rec = parse_erp_fname(n)
+            if rec and rec.ext == 'cnt' and rec.exp in exp_tuple:
+                cnt_dict.setdefault(rec.sub_id, []).append(rec.exp)
+
+        for k,v in cnt_dict.items():
+            if len(set(v)) is not len(exp_tuple): # using set on value could cause problems?
+                missing_exp = '.'.join(str(s) for s in (set(v) ^ set(list(exp_tuple))))
+                print('\n\nLOOK HERE!!!{} cnt file missing from {}\n\n'.format(missing_exp.upper(), path))
+                
+    def set_ps_limits(self, workers, timeout=None):
+        """
+        caps plot_hdf1_data.sh at workers runs at once, each killed after timeout seconds, & resets ps_results
+        """
+
+        self.ps_slots = threading.BoundedSemaphore(workers)
+        self.ps_timeout = timeout
+        self.ps_results = []
+
+    def plot_ps(self, h1):
+        """
+        runs plot_hdf1_data.sh on 1 avg.h1 once a slot is free, waits for it & records how it went
+        """
+
+        with self.ps_slots:
+            code, out, err, timed_out = run_tool(['plot_hdf1_data.sh', os.path.basename(h1)], cwd=os.path.dirname(h1), timeout=self.ps_timeout, on_line=self.stream)
+
+        if timed_out:
+            self.ps_results.append('timed out')
+            return False, "ERROR: plot_hdf1_data.sh timed out after {} seconds on {}".format(self.ps_timeout, h1)
+        if code != 0:
+            self.ps_results.append('failed')
+            return False, "ERROR: plot_hdf1_data.sh exited with {} on {}\n{}".format(code, h1, err.strip())
+        self.ps_results.append('succeeded')
+        return True, "creating ps files.. " + os.path.basename(h1)
+
+    def print_ps_summary(self):
+        """
+        how many plots worked since set_ps_limits
+        """
+
+        if self.ps_results:
+            counts = Counter(self.ps_results)
+            print("\n>>> PS FILES: {} succeeded, {} failed, {} timed out <<<".format(counts['succeeded'], counts['failed'], counts['timed out']))
+                    
+    #get_h1s()                
+    def delete_bad_files(self, path, exts_to_keep=None, to_be_deleted_set=None):
+        ''' returns any extension not in exts_to_keep & prompts user to delete '''
+    
+        self.path = path
+        self.exts_to_keep = exts_to_keep
+        self.to_be_deleted_set = to_be_deleted_set
+
+
+        
+        print("\n\n>>> REMOVING FILES <<<\n") 
+        if exts_to_keep:
+
+            for r,d,f in os.walk(path):
+                for n in f:
+                    rec = parse_erp_fname(n)
+                    if (rec and rec.ext in ('cnt_h1', 'h1', 'h1_ps')) or n == self.h1_manifest:
+                        os.remove(os.path.join(r,n))
+                        print('Removing {}'.format(n))
+
+        if to_be_deleted_set:
+            
+            for r,d,f in os.walk(path):
+                for n in f:
+                    rec = parse_erp_fname(n)
+                    if rec and rec.ext in ('cnt', 'cnt_h1'):
+                        os.remove(os.path.join(r,n))
+                        print('Removing {}'.format(n))
+
+
+
+    
+    def h1_input(self, name, set_of_exps):
+        """
+        True if get_h1s could read the file name when working on set_of_exps, what the H1 tabs prefetch
+        """
+
+        rec = parse_erp_fname(name)
+        return bool(rec) and rec.exp in set_of_exps and rec.ext in ('cnt', 'rerun', 'cnt_h1', 'h1')
+
+    #get_h1s()
+    def plan_h1s(self, path, set_of_exps, trg_dir=None):
+        """
+        returns an h1_job for every cnt in path that get_h1s should work on.
+        with trg_dir cnts (& reruns, minus _rr) get copied to trg_dir/exp, without it the
+        files are worked on in place starting from whatever the furthest along file is
+        """
+
+        index = folder_index(path)
+        files = set(index.files)
+
+        jobs = {}
+        for (r,n), rec in zip(index.files, index.records):
+            if not rec or rec.exp not in set_of_exps:
+                continue
+
+            if rec.ext == 'rerun':
+                if (r, n[:-7] + '.cnt') in files:
+                    print("\n>>> RERUN CNT FOUND <<<\n\nTried to remove '_rr' from {} but that file already exists. File not copied.".format(n))
+                    continue
+                if not trg_dir:
+                    print("\n>>> RERUN CNT FOUND <<<\n\nRerun found for {} -- create h1.ps file manually".format(n))
+                    continue
+                print("\n>>> RERUN CNT FOUND <<<\n\nWill rename {} when copied to {}".format(n, os.path.join(trg_dir, rec.exp)))
+
+            if trg_dir and rec.ext in ('cnt', 'rerun'):
+                job = h1_job(rec.exp, os.path.join(r,n), os.path.join(trg_dir, rec.exp, erp_stem(n)), 'copy')
+            elif not trg_dir and rec.ext in ('cnt', 'cnt_h1', 'h1'):
+                job = h1_job(rec.exp, None, os.path.join(r, erp_stem(n)), {'cnt': 'cnt_h1', 'cnt_h1': 'avg_h1', 'h1': 'ps'}[rec.ext])
+            else:
+                continue
+
+            # keep the furthest back step when a file is there more than once (cnt & cnt.h1 ...)
+            steps = list(self.h1_steps)
+            old = jobs.get(job.stem)
+            if old and old.src and job.src:
+                print("{} is in {} more than once, only copying {}".format(os.path.basename(job.src), path, old.src))
+            elif old is None or steps.index(job.start) < steps.index(old.start):
+                jobs[job.stem] = job
+
+        return sorted(jobs.values(), key=lambda job: job.stem)
+
+    #get_h1s()
+    def job_steps(self, job, ps=None, del_ext=None):
+        """
+        steps job still has to go through
+        """
+
+        steps = list(self.h1_steps)
+        steps = steps[steps.index(job.start):]
+        if job.exp not in self.avgh1_params:
+            steps = [i for i in steps if i not in ('avg_h1', 'ps')]
+        if self.store is not None and 'avg_h1' in steps:
+            steps.insert(0, 'fetch')
+        if not ps:
+            steps = [i for i in steps if i != 'ps']
+        if not (del_ext and job.src):
+            steps = [i for i in steps if i != 'cleanup']
+        return steps
+
+    #get_h1s()
+    def manifest(self, folder):
+        """
+        h1_manifest of folder, read once per get_h1s
+        """
+
+        if folder not in self.manifests:
+            try:
+                with open(os.path.join(folder, self.h1_manifest)) as f:
+                    self.manifests[folder] = json.load(f)
+            except (OSError, ValueError):
+                self.manifests[folder] = {}
+        return self.manifests[folder]
+
+    #get_h1s()
+    def write_manifests(self):
+        """
+        adds the settings of every avg.h1 made since the last call to its folder's h1_manifest
+        """
+
+        made_with, self.made_with = self.made_with, {}
+        by_folder = defaultdict(dict)
+        for output, params in made_with.items():
+            by_folder[os.path.dirname(output)][os.path.basename(output)] = params
+
+        for folder, params in by_folder.items():
+            manifest = self.manifest(folder)
+            manifest.update(params)
+            tmp = os.path.join(folder, self.h1_manifest + '.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(manifest, f, indent=1, sort_keys=True)
+            os.replace(tmp, os.path.join(folder, self.h1_manifest))
+
+    #get_h1s()
+    def stale_step(self, job, ps=None):
+        """
+        first step job has to redo, None if everything it makes is up to date. a step is redone when its file is
+        missing, older than what it's made from or (avg.h1) was made with other filter settings. a copied cnt
+        or cnt.h1 that cleanup removed doesn't count as missing if the files after it are up to date. an avg.h1
+        the manifest doesn't know (made before there was 1) is taken to be made with today's settings
+        """
+
+        steps = list(self.h1_steps)
+        source = job.src or job.stem + self.h1_outputs[steps[steps.index(job.start) - 1]]
+        newest = os.stat(source).st_mtime_ns
+
+        pending = None
+        for step in self.job_steps(job, ps):
+            if step not in self.h1_outputs:
+                continue
+            output = job.stem + self.h1_outputs[step]
+            try:
+                mtime = os.stat(output).st_mtime_ns
+            except OSError:
+                if step not in ('copy', 'cnt_h1'):
+                    return pending or step
+                pending = pending or step
+                continue
+            if mtime < newest:
+                return pending or step
+            if step == 'avg_h1':
+                params = self.manifest(os.path.dirname(output)).get(os.path.basename(output))
+                if params is None:
+                    self.made_with[output] = self.avgh1_params[job.exp]
+                elif params != self.avgh1_params[job.exp]:
+                    return pending or step
+            newest, pending = mtime, None
+        return pending
+
+    #get_h1s()
+    def store_key(self, job, known_only=False):
+        """
+        h1_store key of job's avg.h1 -- the hash & name of the file it's made from, the tools & settings.
+        with known_only None if that file would have to be read to hash it
+        """
+
+        from_cnt = job.start in ('copy', 'cnt_h1')
+        source = job.src or job.stem + ('_32.cnt' if from_cnt else '_cnt.h1')
+        sha = self.store.cached_hash(source) if known_only else self.store.file_hash(source)
+        if sha is None:
+            return None
+        name = os.path.basename(job.stem) + ('_32.cnt' if from_cnt else '_cnt.h1')
+        tools = ([self.h1_tools['cnt_h1']] if from_cnt else []) + [self.h1_tools['avg_h1']]
+        return self.store.key(sha, name, tools, self.avgh1_params[job.exp])
+
+    #get_h1s()
+    def work_stem(self, job):
+        """
+        where job's files are made -- its stem in scratch if its cnt was staged there
+        """
+        return self.work_stems.get(job.stem, job.stem)
+
+    #get_h1s()
+    def step_command(self, job, step):
+        """
+        (command, inputs, outputs) of 1 step of job
+        """
+
+        stem = self.work_stem(job)
+        cnt, cnth1, avgh1 = stem + '_32.cnt', stem + '_cnt.h1', stem + '_avg.h1'
+        if step == 'fetch':
+            return ['h1_store'], [job.src or job.stem + '_32.cnt'], [job.stem + '_avg.h1']
+        if step == 'copy':
+            return ['link_or_copy'], [job.src], [cnt]
+        if step == 'cnt_h1':
+            return [self.h1_tools[step], cnt], [cnt], [cnth1]
+        if step == 'avg_h1':
+            return [self.h1_tools[step]] + self.avgh1_params[job.exp] + [cnth1], [cnth1], [avgh1]
+        if step == 'ps':
+            return [self.h1_tools[step], os.path.basename(avgh1)], [avgh1], [avgh1 + '.ps']
+        return ['remove'], [cnt, cnth1], []
+
+    #get_h1s()
+    def tool_message(self, err, made):
+        """
+        what a step prints when its tool worked -- the tool's stderr unless it was already streamed
+        """
+        if self.stream or not err.strip():
+            return made
+        return err.strip()
+
+    #get_h1s()
+    def run_step(self, step, job):
+        """
+        1 step of job, journaled as started before it runs & finished once it worked
+        """
+
+        if job.stem in self.batch_failed:
+            return False, 'Skipping {} for {} -- a batched run failed on it'.format(step, job.stem)
+        if job.stem in self.failed_jobs:
+            return False, 'Skipping {} for {} -- an earlier step failed'.format(step, job.stem)
+        if self.journal:
+            self.journal.step_started(self.path, job.stem, step, self.step_command(job, step)[2])
+        ok, message = self.h1_steps[step](job)
+        if ok and self.journal:
+            self.journal.step_finished(self.path, job.stem, step)
+        if ok and job.stem in self.work_stems:
+            self.scratch_made[job.stem].add(step)
+        return ok, message
+
+    #get_h1s()
+    def run_batch(self, step, jobs):
+        """
+        1 step of several jobs in the same folder in 1 run of a batch_tools tool. if the run fails every job
+        is rerun on its own so 1 bad file doesn't take the rest down, files still not made go in batch_failed.
+        jobs an earlier step failed on are left out, the batch only fails if that's all of them
+        """
+
+        skipped = ['Skipping {} for {} -- an earlier step failed'.format(step, job.stem) for job in jobs if job.stem in self.failed_jobs]
+        todo = [job for job in jobs if job.stem not in self.fetched and job.stem not in self.batch_failed and job.stem not in self.failed_jobs]
+        if not todo:
+            return len(skipped) < len(jobs), '\n'.join(skipped)
+        jobs = todo
+
+        # some of the folder's cnts may have been staged in scratch & some not
+        folders = defaultdict(list)
+        for job in jobs:
+            folders[os.path.dirname(self.work_stem(job))].append(job)
+        if len(folders) > 1:
+            results = [self.run_batch(step, group) for folder, group in sorted(folders.items())]
+            return any(ok for ok, message in results), '\n'.join(message for ok, message in results if message)
+        folder = list(folders)[0]
+
+        tool = self.h1_tools[step]
+        commands = [self.step_command(job, step) for job in jobs]
+        outputs = [outputs[0] for command, inputs, outputs in commands]
+        for job, output in zip(jobs, outputs):
+            if self.journal:
+                self.journal.step_started(self.path, job.stem, step, [output])
+            # never write through an old avg.h1 that older runs may have hardlinked to the h1 store
+            if os.path.lexists(output):
+                os.remove(output)
+
+        args = commands[0][0][:-1] + [command[-1] for command, inputs, outputs in commands]
+        if step == 'ps':
+            with self.ps_slots:
+                code, out, err, timed_out = run_tool(args, cwd=folder,
+                                                     timeout=self.ps_timeout and self.ps_timeout * len(jobs), on_line=self.stream)
+        else:
+            code, out, err, timed_out = run_tool(args, cwd=folder, on_line=self.stream)
+
+        messages = list(skipped)
+        if code != 0 or timed_out:
+            messages.append("ERROR: {} {} on {} files in {}, running them 1 at a time".format(
+                            tool, 'timed out' if timed_out else 'exited with {}'.format(code), len(jobs), folder))
+            made = []
+            for job in jobs:
+                ok, message = self.h1_steps[step](job)
+                messages.append(message)
+                if ok:
+                    made.append(job)
+                else:
+                    self.batch_failed.add(job.stem)
+        else:
+            if not self.stream and err.strip():
+                messages.append(err.strip())
+            made = []
+            for job, output in zip(jobs, outputs):
+                if os.path.exists(output):
+                    made.append(job)
+                    if step == 'avg_h1':
+                        self.made_with[job.stem + '_avg.h1'] = self.avgh1_params[job.exp]
+                        if job.stem in self.store_keys:
+                            self.store.put(self.store_keys[job.stem], output)
+                else:
+                    self.batch_failed.add(job.stem)
+                    messages.append("ERROR: {} didn't make {}".format(tool, os.path.basename(output)))
+                if step == 'ps':
+                    self.ps_results.append('succeeded' if job in made else 'failed')
+            messages.append("Made {} {} files in 1 {} run".format(len(made), self.h1_outputs[step].lstrip('_'), tool))
+
+        for job in made:
+            if self.journal:
+                self.journal.step_finished(self.path, job.stem, step)
+            if job.stem in self.work_stems:
+                self.scratch_made[job.stem].add(step)
+        return bool(made), '\n'.join(i for i in messages if i)
+
+    #get_h1s()
+    def fetch_avgh1(self, job):
+        """
+        copies job's avg.h1 out of the h1 store if it's been made from the same file with the same settings,
+        the copy/cnt.h1/avg.h1 steps after this do nothing if it was
+        """
+
+        try:
+            key = self.store_key(job)
+            if not self.store.fetch(key, job.stem + '_avg.h1'):
+                self.store_keys[job.stem] = key
+                return True, ''
+        except OSError as e:
+            return True, "h1 store not used for {} -- {}".format(os.path.basename(job.stem), e)
+
+        self.fetched.add(job.stem)
+        self.made_with[job.stem + '_avg.h1'] = self.avgh1_params[job.exp]
+        return True, "Copied {} from the h1 store".format(os.path.basename(job.stem) + '_avg.h1')
+
+    #get_h1s()
+    def stage_cnt(self, job):
+        """
+        puts job's cnt (renamed if it's a rerun) where its h1's get made -- a hardlink if it's on the
+        same filesystem, a copy if not. cleanup only ever removes this link/copy. with scratch the cnt goes
+        there if it has room for it, its cnt.h1 & avg.h1 (each taken to be the cnt's size)
+        """
+
+        if job.stem in self.fetched:
+            return True, ''
+        if self.scratch is not None and self.scratch.take(3 * os.path.getsize(job.src)):
+            self.work_stems[job.stem] = os.path.join(self.scratch.folder, os.path.basename(job.stem))
+            self.scratch_taken[job.stem] = 3 * os.path.getsize(job.src)
+        cnt = self.work_stem(job) + '_32.cnt'
+        how = link_or_copy(job.src, cnt)
+        if os.path.basename(job.src) != os.path.basename(cnt):
+            return True, "{} {} => {}".format(how, job.src, os.path.basename(cnt))
+        return True, "{} {}".format(how, os.path.basename(cnt))
+
+    #get_h1s()
+    def make_cnth1(self, job):
+        """
+        create 1 cnt.h1 file from shell script
+        """
+
+        if job.stem in self.fetched:
+            return True, ''
+        cnt = self.work_stem(job) + '_32.cnt'
+        code, out, err, timed_out = run_tool(self.step_command(job, 'cnt_h1')[0], cwd=os.path.dirname(cnt), on_line=self.stream)
+        if code != 0:
+            return False, "ERROR: create_cnthdf1_from_cntneuroX.sh exited with {} on {}\n{}".format(code, cnt, err.strip())
+        return True, self.tool_message(err, "Made {}".format(os.path.basename(job.stem) + '_cnt.h1'))
+
+    #get_h1s()
+    def make_avgh1(self, job):
+        """
+        create 1 avg.h1 file from shell script
+        """
+
+        if job.stem in self.fetched:
+            return True, ''
+        cnth1 = self.work_stem(job) + '_cnt.h1'
+        avgh1 = self.work_stem(job) + '_avg.h1'
+        # never write through an old avg.h1 that older runs may have hardlinked to the h1 store
+        if os.path.lexists(avgh1):
+            os.remove(avgh1)
+        code, out, err, timed_out = run_tool(self.step_command(job, 'avg_h1')[0], cwd=os.path.dirname(cnth1), on_line=self.stream)
+        if code != 0:
+            return False, "ERROR: create_avghdf1_from_cnthdf1X exited with {} on {}\n{}".format(code, cnth1, err.strip())
+        self.made_with[job.stem + '_avg.h1'] = self.avgh1_params[job.exp]
+        if job.stem in self.store_keys:
+            self.store.put(self.store_keys[job.stem], avgh1)
+        return True, self.tool_message(err, "Made {}".format(os.path.basename(job.stem) + '_avg.h1'))
+
+    #get_h1s()
+    def make_ps(self, job):
+        """
+        create 1 avg.h1.ps file from shell script
+        """
+        return self.plot_ps(self.work_stem(job) + '_avg.h1')
+
+    #get_h1s()
+    def remove_h1_inputs(self, job):
+        """
+        removes the copied cnt & its cnt.h1 once the avg.h1 is made. in scratch everything taken for
+        them is given back, only what the avg.h1 takes up stays taken until it's published
+        """
+
+        removed = []
+        for i in (self.work_stem(job) + '_32.cnt', self.work_stem(job) + '_cnt.h1'):
+            if os.path.exists(i):
+                os.remove(i)
+                removed.append('Removing {}'.format(os.path.basename(i)))
+        if job.stem in self.scratch_taken:
+            avgh1 = self.work_stem(job) + '_avg.h1'
+            left = os.path.getsize(avgh1) if os.path.exists(avgh1) else 0
+            self.scratch.give_back(self.scratch_taken[job.stem] - left)
+            self.scratch_taken[job.stem] = left
+        return True, '\n'.join(removed)
+
+    #get_h1s()
+    def publish_scratch(self):
+        """
+        moves the files of every step that worked in scratch to where they'd have been made without it,
+        in 1 pass once the folder's done -- copy_file goes through a temp file so a half moved file is never left there
+        """
+
+        moved = 0
+        for stem, work in sorted(self.work_stems.items()):
+            for step in self.scratch_made[stem]:
+                ext = self.h1_outputs.get(step)
+                if ext is None or not os.path.exists(work + ext):
+                    continue
+                copy_file(work + ext, stem + ext)
+                os.remove(work + ext)
+                moved+=1
+            self.scratch.give_back(self.scratch_taken.pop(stem, 0))
+        return moved
+
+    def plan_get_h1s(self, path, set_of_exps, del_ext=None, ps=None, trg_dir=None, store=None):
+        """
+        what get_h1s would do with the same arguments, without doing any of it -- an h1_plan_step for every
+        step of every cnt, including the ones that would be skipped as up to date or copied from store
+        """
+
+        if not trg_dir and not ps:
+            return []
+
+        self.store, self.manifests = store, {}
+        plan = []
+        for job in self.plan_h1s(path, set_of_exps, trg_dir):
+            stale = self.stale_step(job, ps)
+            steps = self.job_steps(job, ps, del_ext)
+            todo = self.job_steps(job._replace(start=stale), ps, del_ext) if stale else []
+            stored = False
+            if stale and 'fetch' in todo:
+                key = self.store_key(job._replace(start=stale), known_only=True)
+                stored = key is not None and os.path.exists(store.stored(key))
+            for step in steps:
+                if step not in todo:
+                    status = 'up to date'
+                elif stored and step in ('copy', 'cnt_h1', 'avg_h1'):
+                    status = 'h1 store'
+                else:
+                    status = 'run'
+                command, inputs, outputs = self.step_command(job, step)
+                plan.append(h1_plan_step(job.stem, step, command, inputs, outputs, status))
+        # a plan doesn't write manifests, stale_step's note of old avg.h1's settings waits for get_h1s
+        self.store, self.made_with = None, {}
+        return plan
+
+    def print_h1_plan(self, plan, workers=1, ps_workers=None):
+        """
+        prints a plan_get_h1s plan & a rough run time from tool_metrics, returns {tool: runs} & the estimate in seconds
+        """
+
+        runs = Counter()
+        for i in plan:
+            command = i.command if i.step in self.h1_tools else i.command + i.inputs
+            print("{:<11} {:<8} {} => {}".format(i.status, i.step, ' '.join(command), ', '.join(os.path.basename(o) for o in i.outputs) or '-'))
+            if i.status == 'run' and i.step in self.h1_tools:
+                runs[self.h1_tools[i.step]]+=1
+
+        print('\n>>> PLAN: {} steps, {} up to date, {} from the h1 store <<<'.format(
+            len(plan), sum(i.status == 'up to date' for i in plan), sum(i.status == 'h1 store' for i in plan)))
+
+        typical = self.metrics.typical_seconds()
+        estimate = 0
+        for tool in self.h1_tools.values():
+            if runs[tool] == 0:
+                continue
+            if tool not in typical:
+                print('{}: {} runs, no timings recorded yet'.format(tool, runs[tool]))
+                continue
+            at_once = min(ps_workers or workers, workers) if tool == self.h1_tools['ps'] else workers
+            estimate+=runs[tool] * typical[tool] / at_once
+            print('{}: {} runs x {:.1f}s on {} worker(s)'.format(tool, runs[tool], typical[tool], at_once))
+        print('Estimated run time: {} (h:mm:ss)'.format(timedelta(seconds=round(estimate))))
+        return dict(runs), estimate
+
+    def get_h1s(self, path, set_of_exps, del_ext=None, ps=None, trg_dir=None, workers=1, ps_workers=None, ps_timeout=None, store=None,
+                stream=None, progress=None, journal=None, batch_tools=(),
+                scratch=None, scratch_cap=None):
+        '''combines all these commands together -- every cnt goes through copy => cnt.h1 => avg.h1 => ps on its own,
+        workers cnts at a time & at most ps_workers (default workers) plots at once. avg.h1's already in store
+        (an h1_store) are copied instead of made. stream gets tool output lines as they're written &
+        progress(files done, files planned) is called with the counts to add as files are planned & finish.
+        with journal (an h1_journal) every step is checkpointed, outputs of steps an earlier run didn't finish
+        are removed & remade & path is marked done once nothing in it failed. steps of the tools in batch_tools
+        run on all of a folder's files at once (split over the workers) instead of 1 file at a time. with trg_dir
+        & scratch (a local folder) cnts are copied to scratch & worked on there, only what's left at the end
+        (the avg.h1's) is written to trg_dir. scratch_cap is the most bytes scratch is given.
+        returns how many cnt files had a step fail or skipped, 0 if everything worked'''
+        
+        self.path = path
+        self.set_of_exps = set_of_exps
+        self.ps = ps
+        self.trg_dir = trg_dir
+        
+        self.cnth1_tups = tuple(set_of_exps)
+        self.ps_results = []
+
+        if not trg_dir and not ps:
+            return 0
+
+        #if being used for peak picking, create new directories and move all cnt files to the correct folder...and so on
+        if trg_dir:
+            #create new directories
+            for exp in set_of_exps:
+                new_dirs = os.path.join(trg_dir, exp)
+                if not os.path.exists(new_dirs):
+                    os.makedirs(new_dirs)
+                    print(">>> Creating {} <<<".format(new_dirs))
+
+        jobs = self.plan_h1s(path, set_of_exps, trg_dir)
+        if trg_dir:
+            self.check_cnt_copy(trg_dir, self.cnth1_tups, names=[os.path.basename(job.stem) + '_32.cnt' for job in jobs])
+
+        # partly written by a run that was stopped halfway
+        if journal:
+            for i in journal.clear_partial(path):
+                if os.path.lexists(i):
+                    os.remove(i)
+                    print("Removing {} -- the last run stopped while making it".format(os.path.basename(i)))
+
+        # only redo what's missing, out of date or made with other settings
+        self.store, self.store_keys, self.fetched = store, {}, set()
+        self.manifests, self.made_with = {}, {}
+        planned = len(jobs)
+        jobs = [job._replace(start=start) for job, start in ((job, self.stale_step(job, ps)) for job in jobs) if start]
+        if planned != len(jobs):
+            print('\n{} of {} cnt files are already up to date'.format(planned - len(jobs), planned))
+        if progress:
+            progress(0, len(jobs))
+        if not jobs:
+            self.write_manifests()
+            if journal:
+                journal.folder_done(path)
+            return 0
+
+        self.set_ps_limits(ps_workers or workers, ps_timeout)
+        self.stream, self.journal = stream, journal
+        self.batch_tools, self.batch_failed, self.failed_jobs = set(batch_tools), set(), set()
+        self.work_stems, self.scratch_made, self.scratch_taken = {}, defaultdict(set), {}
+        self.scratch = scratch_space(scratch, scratch_cap) if scratch and trg_dir else None
+        try:
+            failed = self.run_h1_jobs(jobs, ps, del_ext, workers, progress)
+        finally:
+            # whatever finished in scratch is still published & scratch never outlives the call, even if a step blew up
+            self.stream, self.journal, self.batch_tools = None, None, set()
+            if self.scratch is not None:
+                try:
+                    moved = self.publish_scratch()
+                    if moved:
+                        print('\nMoved {} files from scratch to {}'.format(moved, trg_dir))
+                finally:
+                    self.scratch.remove()
+                    self.scratch = None
+        self.write_manifests()
+        if journal and not failed:
+            journal.folder_done(path)
+        if self.fetched:
+            print('\n{} avg.h1 files copied from the h1 store'.format(len(self.fetched)))
+        if self.batch_failed:
+            print('{} cnt files failed in batched runs: {}'.format(len(self.batch_failed), ', '.join(sorted(os.path.basename(i) for i in self.batch_failed))))
+        self.print_ps_summary()
+
+        return failed
+
+    #get_h1s()
+    def run_h1_jobs(self, jobs, ps, del_ext, workers, progress=None):
+        """
+        runs every step of jobs on a task_graph of workers threads, returns how many jobs had a step fail or skipped
+        """
+
+        graph = task_graph(workers)
+        steps = {job.stem: self.job_steps(job, ps, del_ext) for job in jobs}
+        last = {}
+        # task => stems of the jobs it's a step of
+        task_stems = {}
+        for step in self.h1_steps:
+            todo = [job for job in jobs if step in steps[job.stem]]
+            if self.h1_tools.get(step) not in self.batch_tools:
+                for job in todo:
+                    last[job.stem] = graph.add('{} for {}'.format(step, job.stem), self.run_step, (step, job), [last[job.stem]] if job.stem in last else ())
+                    task_stems[last[job.stem]] = [job.stem]
+                continue
+
+            # 1 run per batch of a folder's files with the same settings
+            groups = defaultdict(list)
+            for job in todo:
+                command = self.step_command(job, step)[0]
+                groups[(os.path.dirname(job.stem), tuple(command[:-1]))].append((command[-1], job))
+            for (folder, command), group in sorted(groups.items()):
+                by_file = dict(group)
+                for batch in arg_batches(command, [i for i, job in group], -(-len(group) // workers)):
+                    batch = [by_file[i] for i in batch]
+                    if len(batch) == 1:
+                        job = batch[0]
+                        last[job.stem] = graph.add('{} for {}'.format(step, job.stem), self.run_step, (step, job), [last[job.stem]] if job.stem in last else ())
+                        task_stems[last[job.stem]] = [job.stem]
+                        continue
+                    # 1 cnt's earlier step failing doesn't stop the rest of the batch, run_batch leaves it out
+                    name = graph.add('{} for {} & {} more'.format(step, batch[0].stem, len(batch) - 1), self.run_batch, (step, batch),
+                                     soft=sorted(set(last[job.stem] for job in batch if job.stem in last)))
+                    last.update(dict.fromkeys((job.stem for job in batch), name))
+                    task_stems[name] = [job.stem for job in batch]
+        last_steps = Counter(last.values())
+
+        print('\n>>> MAKING H1 FILES FOR {} CNT FILES ON {} WORKER(S) <<<\n'.format(len(jobs), workers))
+        failed = 0
+        for name, ok, message in graph.run():
+            if not ok:
+                failed+=1
+                # before anything waiting on this task starts
+                self.failed_jobs.update(task_stems[name])
+            if message:
+                print(message)
+            if progress and name in last_steps:
+                progress(last_steps[name], 0)
+        print('\n{} of {} steps done, {} failed or skipped'.format(len(graph.tasks) - failed, len(graph.tasks), failed))
+        return len(self.failed_jobs | self.batch_failed)
+            
+
+sd = site_data()
+
+
+def concat_peak_paths(site, exp_name):
+    """
+    concats path to peak picked and reject directory for any site
+    """
+
+
+    peak_pick_dirs = ['ant_phase4__NewPPicker_peaks_2018', 'aod_phase4__NewPPicker_peaks_2018', 
+                      'vp3_phase4__NewPPicker_peaks_2018']
+
+    hbnl = '/vol01/active_projects/HBNL/'
+
+    pp_dirs = []
+
+    for i in peak_pick_dirs:
+        if exp_name in i:
+            good_dir = hbnl + i + '/' + site
+            rej_dir = os.path.join(good_dir, 'reject')
+            pp_dirs.append(good_dir)
+            pp_dirs.append(rej_dir)
+            
+    return pp_dirs
+
+
+def create_peaks_dict(path_to_picked_files, index=None):
+    """
+    creates a nested dict of lists {exp_name:{sub_id:[mt, h1, pdf]}}
+    """
+    
+    index = index or folder_index(path_to_picked_files)
+    peaks_dict ={}
+    for (root, fname), rec in zip(index.files, index.records):
+        if rec and rec.ext in ('h1', 'pdf', 'mt'):
+            peaks_dict.setdefault(rec.exp, {}).setdefault(rec.sub_id, []).append(rec.ext)
+    return peaks_dict
+
+
+def peak_files_by_sub(index):
+    """
+    {folder: {sub_id: [paths]}} of every erp file in a folder_index -- what move_peaks looks files up in
+    instead of globbing *sub_id* for every subject
+    """
+
+    by_folder = defaultdict(lambda: defaultdict(list))
+    for (root, fname), rec in zip(index.files, index.records):
+        if rec:
+            by_folder[root][rec.sub_id].append(os.path.join(root, fname))
+    return by_folder
+
+
+def move_peaks(path_to_picked_files, peaks_dict, exp_name, site, by_folder=None, existing=None, engine=None):
+    """
+    copies exp_name's files of every sub with an h1, mt & pdf to its HBNL folder, the rest to reject.
+    by_folder (peak_files_by_sub), existing ({HBNL folder: fnames already in it}) & engine (copy_engine)
+    come from start_mover so nothing is listed more than once, they're made here when move_peaks is called on its own
+    """
+
+    if by_folder is None:
+        by_folder = peak_files_by_sub(folder_index(path_to_picked_files))
+    if existing is None:
+        existing = {}
+    if engine is None:
+        engine = copy_engine(verify=True)
+
+    concat_hbnl_path = os.path.join(path_to_picked_files, exp_name)
+    sub_files = by_folder.get(concat_hbnl_path, {})
+    
+    count_spacer_accepted = 0
+    count_spacer_rejected = 0
+    accepted_count = 0
+    rejected_count = 0
+    
+    # (sub header, None, None) / (fname, dst, accepted) rows in the order they're printed, dst None if it's already there
+    rows = []
+    for k,v in peaks_dict.items():
+        if exp_name in k:
+            for sub_id, file_exts in v.items():
+                accepted = 'mt' in file_exts and len(file_exts) == 3
+                rows.append(("\n{} {} {}".format(k, sub_id, file_exts), None, None))
+                # reject directory unless it has all 3 files
+                trg_dir = concat_peak_paths(site, exp_name)[0 if accepted else 1]
+                if trg_dir not in existing:
+                    existing[trg_dir] = set(os.listdir(trg_dir)) if os.path.isdir(trg_dir) else set()
+                for fname in sorted(sub_files.get(sub_id, [])):
+                    dst = os.path.join(trg_dir, os.path.basename(fname))
+                    if os.path.basename(fname) in existing[trg_dir]:
+                        rows.append((dst, None, accepted))
+                        continue
+                    existing[trg_dir].add(os.path.basename(fname))
+                    rows.append((fname, dst, accepted))
+
+    # copied workers at a time, results come back in rows' order
+    copied = engine.copy_all((fname, dst) for fname, dst, accepted in rows if dst)
+
+    print("{} FILES TO ME MOVED\n\n".format(exp_name.upper()))
+    for fname, dst, accepted in rows:
+        if accepted is None:
+            print(fname)
+            continue
+        if dst is None:
+            print("{} already exists!".format(fname))
+            continue
+        status = next(copied)[2]
+        if status in ('identical', 'exists'):
+            print("{} already exists!".format(dst))
+            continue
+        if status == 'failed':
+            print("ERROR: couldn't copy {} to {} -- {}".format(fname, dst, engine.errors[dst]))
+            continue
+        print("Moved {}".format(fname))
+        if accepted:
+            count_spacer_accepted+=1
+            accepted_count+=1
+            if count_spacer_accepted %3 == 0:
+                print('\n\n')
+        else:
+            count_spacer_rejected+=1
+            rejected_count+=1
+            if count_spacer_rejected %2 == 0:
+                print('\n\n')
+
+    print ("\n\nTotal of {} subs accepted.\nTotal of {} subs rejected.\n\n".format(int(accepted_count / 3), int(rejected_count /2)))
+
+def h1_folders(path, exclude=()):
+    """
+    folders the H1 tabs run get_h1s() on -- path itself if it has no sub-directories,
+    the folders directly inside path minus exclude if there's anything to exclude,
+    otherwise every directory under path
+    """
+
+    dirs = [os.path.join(r,n) for r,d,f in os.walk(path) for n in d]
+    if len(dirs) == 0:
+        return [path]
+    if len(exclude) != 0:
+        return [os.path.join(path, i) for i in sorted(os.listdir(path)) if i not in exclude and os.path.isdir(os.path.join(path, i))]
+    return dirs
+
+
+def start_mover(path_to_picked_files, site, index=None):
+    """
+    path_to_picked_files must not have aod/vp3/ant append to it.
+    everything comes from 1 folder_index of it (made here if not given). returns how many files couldn't be copied
+    """
+    
+    index = index or folder_index(path_to_picked_files)
+    peaks_dict = create_peaks_dict(path_to_picked_files, index)
+    by_folder = peak_files_by_sub(index)
+    existing = {}
+    engine = copy_engine(verify=True)
+    
+    exp_names = [os.path.basename(d) for d in index.dirs]
+    
+    for exp in exp_names:
+        move_peaks(path_to_picked_files, peaks_dict, exp, site, by_folder, existing, engine)
+    engine.report()
+    return len(engine.errors)
+
+
+def checkIds(subId, directorySite):
+    """
+    given a list of IDS, takes first index of ID to see if it matches site name.
+    returns False (after printing why) if it doesn't
+    """
+    
+    site_dict = {'1': 'uconn', '2': 'indiana', '3': 'iowa',
+             '4': 'suny', '5': 'washu', '6': 'ucsd'}
+    
+    siteToId = subId[0] in site_dict and directorySite == site_dict[subId[0]] 
+    if siteToId == False:
+        print("ERROR: {} does not match site name {}".format(subId, directorySite))
+    return siteToId
+
+
+
+
+
+################################### NEW FUNCTIONS START HERE ###################################
+
+def parse_mt_files(single_mt_path):
+    """
+    parses an mt file to create a frequency dictionary of condition & peak
+    """
+    
+    peaks_lst = []
+    sub_id = []
+    with open(single_mt_path, 'r') as file:
+        for line in file:
+            if line.startswith('#'):
+                pass
+            else:
+                sp = line.split(None, 10)
+                peaks_lst.append(sp[5]+ '_' +  sp[7])
+                sub_id.append(sp[0])
+
+
+    peaks_counter = Counter(sorted(peaks_lst))            
+
+    mt_dict = {}
+    mt_dict[sub_id[0]] = peaks_counter
+    
+    return mt_dict
+
+def check_parsed_mt_files(peak_pick_path):
+    """
+    given a path to folder with mt files, collects parses them & checks for accuracy.
+    works with an entire HBNL exp folder or exp folders for speicfic sites.
+    """
+    print('Finding mt files...\n')
+    mts = [os.path.join(r,n) for r,d,f in os.walk(peak_pick_path) for n in f if n.endswith('mt')]
+    
+    print('Found {} mt files.\nParsing mt files...\n'.format(len(mts)))
+    lst = []
+    for i in mts:
+        lst.append(parse_mt_files(i))
+       
+    parsed_exp_dict ={}
+    for i in lst:
+        d = i
+        for k,v in d.items():
+            for k1,v1 in v.items():
+                parsed_exp_dict.setdefault(k, {})[k1] =v1
+                
+    # correct dictionaries for aod/vp3/ant          
+    aod_dict = {'1_N1': 61, '2_P2': 61, '2_N1': 61, '1_P3': 61}
+    vp3_dict = {'3_N1': 61, '2_N1': 61, '1_P3': 61, '2_P3': 61, '1_N1': 61, '3_P3': 61}
+    ant_dict = {'1_N4': 61, '2_N4': 61, '1_P3': 61, '2_P3': 61, '3_N4': 61, '3_P3': 61}
+
+    mt_check_dict = {}
+    mt_check_dict['ant'] = ant_dict
+    mt_check_dict['aod'] = aod_dict
+    mt_check_dict['vp3'] = vp3_dict
+
+    exp_name = ""
+    if peak_pick_path.endswith(('indiana', 'iowa', 'suny', 'uconn', 'ucsd', 'washu')):
+        exp_name+=os.path.basename(os.path.dirname(peak_pick_path))[:3]
+    else: 
+        exp_name+=os.path.basename(peak_pick_path)[:3]
+    
+    exp_name_dict = mt_check_dict[exp_name]
+
+
+    bad_ids = []
+    for k,v in parsed_exp_dict.items():
+        if v != exp_name_dict:
+            bad_ids.append(k)
+            
+    if len(bad_ids) == 0:
+        return "All files correctly picked!"
+
+    bad_h1s = []
+    for i in bad_ids:
+        wildcard = "{}".format(i)
+        for r,d,f in os.walk(peak_pick_path):
+            for n in f:
+                rec = parse_erp_fname(n)
+                if rec and rec.ext == 'h1' and wildcard in n:
+                    bad_h1s.append(os.path.join(r,n))
+    return bad_h1s
@@ -14,12 +14,13 @@ from random import choice
 # neuropsych function modules
 from collections import defaultdict, Counter
 from glob import glob
-import shutil
 import re
 from datetime import datetime
 import hashlib
 import functools
 
+from copyTools import copy_engine, checksum_manifest, checksums_name
+
 
 # class to display data frame in PyQt
 
@@ -109,6 +110,9 @@ def move_neuro_files(new_site_data, neuro_path_server):
     num_files_dict = defaultdict(int)
     for r,d,f in os.walk(new_site_data):
         for n in f:
+            # md5 manifests copy_engine leaves behind aren't neuropsych data
+            if n == checksums_name:
+                continue
             sub_ids = n.split('_')[0]
             num_files_dict[sub_ids] +=1
             
@@ -153,13 +157,13 @@ def move_neuro_files(new_site_data, neuro_path_server):
         for n in d:
             if n in dirs_found:
                 path = os.path.join(r,n)
-                files = os.listdir(path)
+                files = [i for i in os.listdir(path) if i != checksums_name]
                 for fi in files:
                     have_rawdata_dir = r + '/' + n + '/' + fi
                     files_to_move.append(have_rawdata_dir)
             else:
                 new_dirs_path = os.path.join(r,n)
-                new_dirs_files = os.listdir(new_dirs_path)
+                new_dirs_files = [i for i in os.listdir(new_dirs_path) if i != checksums_name]
                 for new in new_dirs_files:
                     files_that_need_new_dirs.append(os.path.join(new_dirs_path,new))
                     
@@ -185,7 +189,15 @@ def move_neuro_files(new_site_data, neuro_path_server):
         
     neuro_dict.update(neuro_dict_new_dirs)
     
-    # move files 
+    # move files -- copied workers at a time, results come back in neuro_dict's order.
+    # each file's md5 is taken as it's copied & kept in its raw data folder's checksums_name.
+    # only the 1st file going to a raw data path is copied, the rest would write the same file at once
+    engine = copy_engine(verify=True)
+    first_source = {}
+    for k,v in neuro_dict.items():
+        for newdata in v:
+            first_source.setdefault(os.path.join(k, os.path.basename(newdata)), newdata)
+    copied = engine.copy_all([(newdata, to_be_moved) for to_be_moved, newdata in first_source.items()])
     subs_moved = []
     count = 0
     print('>>> Moving neuropsych files <<< ')
@@ -194,12 +206,18 @@ def move_neuro_files(new_site_data, neuro_path_server):
         print("\n\n{} || {}\n".format(count,k))
         for newdata in v:
             to_be_moved = os.path.join(k, os.path.basename(newdata))
-            if not os.path.exists(to_be_moved):
-                shutil.copy(newdata, to_be_moved)
+            if first_source[to_be_moved] != newdata:
+                print('{}\n file already exists in \n{}\n skipped -- {} is copied there\n'.format(newdata, k, first_source[to_be_moved]))
+                continue
+            newdata, to_be_moved, status = next(copied)
+            if status == 'copied':
                 print('\nNew Data Directory - {}\nRaw Data Directory - {}'.format(newdata, to_be_moved))
                 subs_moved.append(to_be_moved)
+            elif status == 'failed':
+                print("ERROR: couldn't copy {} to {} -- {}".format(newdata, to_be_moved, engine.errors[to_be_moved]))
             else:
                 print('{}\n file already exists in \n{}\n'.format(newdata, os.path.dirname(to_be_moved)))
+    engine.report()
                 
     num_subs = set([os.path.basename(i).split('_')[0] for i in subs_moved])
     print('\n\nTotal of {} subjects moved from {} to {}\n\n'.format(len(num_subs), new_site_data, neuro_path_server))
@@ -281,6 +299,8 @@ class neuropsych_check:
 
         neuro_dict = {}
         for f in os.listdir(path):
+            if f == checksums_name:
+                continue
             if f.endswith('_sum.txt'):
                 sum_txt_split = f.split('_')
                 self.create_neuro_dict(key, neuro_dict, 'sum.txt', 'exp_name', sum_txt_split[1])
@@ -464,15 +484,18 @@ class neuropsych_check:
 
     def md5_check_walk(self, path):
         """
-        return any file pairs with matching checksums 
+        return any file pairs with matching checksums -- md5s kept when the files were copied in are reused
         """
         self.path = path
         
         md5_dict = defaultdict(list)
         for r,d,f in os.walk(path):
+            manifest = checksum_manifest(r)
             for n in f:
+                if n == checksums_name:
+                    continue
                 fp = os.path.join(r,n)
-                md5_dict[self.md5(fp)].append(fp)
+                md5_dict[manifest.get(n) or self.md5(fp)].append(fp)
         
         dupes_list = []
         for k,v in md5_dict.items():
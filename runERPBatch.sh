@@ -0,0 +1,6 @@
+#!/usr/bin/bash
+source /usr/local/anaconda3/bin/activate dbI
+
+# no GUI -- e.g. from cron: runERPBatch.sh review /vol01/active_projects/anthony/ns650 --workers 8 > review.jsonl
+
+python3 /vol01/active_projects/anthony/pyqt_logs/erpBatch.py "$@"
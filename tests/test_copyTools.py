@@ -0,0 +1,67 @@
+import hashlib
+import os
+
+from copyTools import copy_engine, checksum_manifest, checksums_name
+
+
+def make(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_copy(tmp_path):
+    src = make(tmp_path / 'a' / 'x.cnt', b'x' * 1000)
+    dst = str(tmp_path / 'x.cnt')
+    engine = copy_engine()
+    assert list(engine.copy_all([(src, dst)])) == [(src, dst, 'copied')]
+    assert open(dst, 'rb').read() == b'x' * 1000
+    assert engine.files == 1 and engine.bytes == 1000
+    # nothing but the copy is left next to it
+    assert sorted(os.listdir(str(tmp_path))) == ['a', 'x.cnt']
+
+
+def test_identical_skipped(tmp_path):
+    src = make(tmp_path / 'a' / 'x.cnt', b'x')
+    dst = str(tmp_path / 'x.cnt')
+    copy_engine().copy(src, dst)
+    engine = copy_engine()
+    assert engine.copy(src, dst) == 'identical'
+    assert engine.skipped == 1
+
+
+def test_exists_not_overwritten(tmp_path):
+    src = make(tmp_path / 'a' / 'x.cnt', b'new')
+    dst = make(tmp_path / 'x.cnt', b'older')
+    assert copy_engine().copy(src, dst) == 'exists'
+    assert open(dst, 'rb').read() == b'older'
+    assert copy_engine(overwrite=True).copy(src, dst) == 'copied'
+    assert open(dst, 'rb').read() == b'new'
+
+
+def test_missing_folder_fails(tmp_path):
+    src = make(tmp_path / 'a' / 'x.cnt', b'x')
+    dst = str(tmp_path / 'nowhere' / 'x.cnt')
+    engine = copy_engine()
+    assert engine.copy(src, dst) == 'failed'
+    assert dst in engine.errors
+
+
+def test_verify_writes_manifest(tmp_path):
+    src = make(tmp_path / 'a' / 'x.cnt', b'data')
+    dst = str(tmp_path / 'b' / 'x.cnt')
+    os.makedirs(os.path.dirname(dst))
+    assert copy_engine(verify=True).copy(src, dst) == 'copied'
+    assert checksum_manifest(os.path.dirname(dst)).get('x.cnt') == hashlib.md5(b'data').hexdigest()
+    with open(os.path.join(os.path.dirname(dst), checksums_name)) as f:
+        assert f.read() == '{}  x.cnt\n'.format(hashlib.md5(b'data').hexdigest())
+
+
+def test_verify_source_manifest_mismatch(tmp_path):
+    src = make(tmp_path / 'a' / 'x.cnt', b'data')
+    make(tmp_path / 'a' / checksums_name, '{}  x.cnt\n'.format(hashlib.md5(b'other').hexdigest()).encode())
+    dst = str(tmp_path / 'x.cnt')
+    engine = copy_engine(verify=True)
+    assert engine.copy(src, dst) == 'failed'
+    assert not os.path.exists(dst)
+    assert "doesn't match" in engine.errors[dst]
@@ -0,0 +1,380 @@
+import json
+import os
+import stat
+
+import pytest
+
+import erpTools
+from erpTools import parse_erp_fname, erp_file, h1_journal, h1_store, site_data, task_graph
+
+
+def test_parse_erp_fname_cnt():
+    assert parse_erp_fname('vp3_6_a1_40001009_32.cnt') == erp_file('vp3', '6', 'a', '1', '40001009', 'cnt')
+
+
+def test_parse_erp_fname_avg():
+    assert parse_erp_fname('cpt_4_a1_40001009A.avg') == erp_file('cpt', '4', 'a', '1', '40001009', 'avg')
+
+
+def test_parse_erp_fname_rerun():
+    assert parse_erp_fname('ant_6_b2_40001009_32_rr.cnt').ext == 'rerun'
+
+
+def test_parse_erp_fname_h1_ps():
+    assert parse_erp_fname('ant_6_a1_40001009_avg.h1.ps').ext == 'h1_ps'
+
+
+def test_parse_erp_fname_other_extension():
+    assert parse_erp_fname('ant_6_a1_40001009.txt').ext is None
+
+
+def test_parse_erp_fname_not_erp():
+    assert parse_erp_fname('notes.txt') is None
+
+
+def h1_args():
+    return {'set_of_exps': {'vp3', 'ant'}, 'trg_dir': '/tmp/trg'}
+
+
+def test_h1_journal_resume(tmp_path):
+    path = str(tmp_path / 'h1_journal.jsonl')
+    journal = h1_journal(path)
+    journal.start(['/a', '/b', '/c'], h1_args())
+    journal.folder_done('/a')
+    journal.close()
+
+    folders, args = h1_journal(path).resume()
+    assert folders == ['/b', '/c']
+    assert args == h1_args()
+
+
+def test_h1_journal_resume_unfinished_step(tmp_path):
+    path = str(tmp_path / 'h1_journal.jsonl')
+    journal = h1_journal(path)
+    journal.start(['/a'], h1_args())
+    journal.step_started('/a', 'vp3_6_a1_40001009', 'cnt_h1', ['/a/vp3_6_a1_40001009_cnt.h1'])
+    journal.step_started('/a', 'ant_6_a1_40001009', 'avg_h1', ['/a/ant_6_a1_40001009_avg.h1'])
+    journal.step_finished('/a', 'ant_6_a1_40001009', 'avg_h1')
+    journal.close()
+    # a crash part way through writing a line
+    with open(path, 'a') as f:
+        f.write('{"event": "fold')
+
+    resumed = h1_journal(path)
+    folders, args = resumed.resume()
+    assert folders == ['/a']
+    assert resumed.clear_partial('/a') == ['/a/vp3_6_a1_40001009_cnt.h1']
+    resumed.close()
+
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines[-2] == '{"event": "fold'
+    assert json.loads(lines[-1]) == {'event': 'cleared', 'folder': '/a'}
+
+    # the cleared step stays cleared the next time round
+    again = h1_journal(path)
+    assert again.resume()[0] == ['/a']
+    assert again.clear_partial('/a') == []
+    again.close()
+
+
+def test_h1_journal_resume_no_batch(tmp_path):
+    assert h1_journal(str(tmp_path / 'missing.jsonl')).resume() is None
+
+    empty = tmp_path / 'empty.jsonl'
+    empty.write_text('')
+    assert h1_journal(str(empty)).resume() is None
+
+
+@pytest.fixture
+def h1_tools(tmp_path, monkeypatch):
+    """
+    stand ins for the h1 tools on PATH -- cnt.h1's of cnts with $FAIL_CNT in their name fail,
+    avg.h1's of ones with $SKIP_AVG in their name just aren't made. every run is logged in $TOOL_LOG
+    """
+
+    tools = {
+        'create_cnthdf1_from_cntneuroX.sh': 'case "$1" in *"${FAIL_CNT:-none}"*) echo bad cnt >&2; exit 3;; esac\ncp "$1" "${1%_32.cnt}_cnt.h1"\n',
+        'create_avghdf1_from_cnthdf1X': 'for i in "$@"; do case "$i" in *"${SKIP_AVG:-none}"*) ;; *_cnt.h1) cp "$i" "${i%_cnt.h1}_avg.h1";; esac; done\n',
+        'plot_hdf1_data.sh': 'for i in "$@"; do echo ps > "$i.ps"; done\n',
+    }
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    for name, body in tools.items():
+        tool = bin_dir / name
+        tool.write_text('#!/bin/sh\necho "$(basename "$0")" >> "$TOOL_LOG"\n' + body)
+        tool.chmod(tool.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv('PATH', '{}:{}'.format(bin_dir, os.environ['PATH']))
+    monkeypatch.setenv('TOOL_LOG', str(tmp_path / 'tools.log'))
+    monkeypatch.setattr(erpTools.metrics, 'path', str(tmp_path / 'tool_metrics.jsonl'))
+
+
+def make_cnts(folder, *sub_ids):
+    folder.mkdir(parents=True, exist_ok=True)
+    for sub_id in sub_ids:
+        (folder / 'vp3_6_a1_{}_32.cnt'.format(sub_id)).write_bytes(sub_id.encode() * 100)
+    return str(folder)
+
+
+def test_batch_leaves_out_cnt_whose_step_failed(tmp_path, h1_tools, monkeypatch):
+    monkeypatch.setenv('FAIL_CNT', '40001002')
+    path = make_cnts(tmp_path / 'site', '40001001', '40001002')
+    trg = tmp_path / 'trg'
+    sd = site_data()
+
+    failed = sd.get_h1s(path, {'vp3'}, del_ext=True, trg_dir=str(trg), batch_tools=['create_avghdf1_from_cnthdf1X'])
+
+    assert failed == 1
+    assert sorted(os.listdir(str(trg / 'vp3'))) == ['.h1_manifest.json', 'vp3_6_a1_40001001_avg.h1', 'vp3_6_a1_40001002_32.cnt']
+
+
+def test_batch_failure_counted_once(tmp_path, h1_tools, monkeypatch):
+    monkeypatch.setenv('SKIP_AVG', '40001002')
+    path = make_cnts(tmp_path / 'site', '40001001', '40001002')
+    sd = site_data()
+
+    failed = sd.get_h1s(path, {'vp3'}, del_ext=True, trg_dir=str(tmp_path / 'trg'), batch_tools=['create_avghdf1_from_cnthdf1X'])
+
+    assert failed == 1
+    assert sd.batch_failed == {str(tmp_path / 'trg' / 'vp3' / 'vp3_6_a1_40001002')}
+
+
+def test_task_graph_skips_what_depends_on_a_failure():
+    graph = task_graph(2)
+    ran = []
+
+    def step(name, ok=True):
+        ran.append(name)
+        return ok, ''
+
+    graph.add('a', step, ('a', False))
+    graph.add('b', step, ('b',), ['a'])
+    graph.add('c', step, ('c',), ['b'])
+    graph.add('d', step, ('d',))
+    graph.add('e', step, ('e',), soft=['b', 'd'])
+
+    results = {name: (ok, message) for name, ok, message in graph.run()}
+
+    assert sorted(ran) == ['a', 'd', 'e']
+    assert results['b'] == (False, 'Skipping b -- an earlier step failed')
+    assert results['c'][0] is False
+    assert results['e'] == (True, '')
+
+
+def tool_runs(tmp_path):
+    log = tmp_path / 'tools.log'
+    return log.read_text().split() if log.exists() else []
+
+
+def test_up_to_date_avgh1_not_remade(tmp_path, h1_tools):
+    path = make_cnts(tmp_path / 'site', '40001001')
+    trg = str(tmp_path / 'trg')
+    assert site_data().get_h1s(path, {'vp3'}, del_ext=True, trg_dir=trg) == 0
+    runs = len(tool_runs(tmp_path))
+
+    assert site_data().get_h1s(path, {'vp3'}, del_ext=True, trg_dir=trg) == 0
+    assert len(tool_runs(tmp_path)) == runs
+
+
+def test_avgh1_remade_with_new_settings(tmp_path, h1_tools):
+    path = make_cnts(tmp_path / 'site', '40001001')
+    trg = str(tmp_path / 'trg')
+    site_data().get_h1s(path, {'vp3'}, del_ext=True, trg_dir=trg)
+    sd = site_data()
+    sd.avgh1_params['vp3'] = sd.avgh1_params['vp3'][:-1] + ['-100']
+
+    assert sd.get_h1s(path, {'vp3'}, del_ext=True, trg_dir=trg) == 0
+    assert tool_runs(tmp_path).count('create_avghdf1_from_cnthdf1X') == 2
+    with open(os.path.join(trg, 'vp3', '.h1_manifest.json')) as f:
+        assert json.load(f) == {'vp3_6_a1_40001001_avg.h1': sd.avgh1_params['vp3']}
+
+
+def test_avgh1_older_than_cnt_remade(tmp_path, h1_tools):
+    path = make_cnts(tmp_path / 'site', '40001001')
+    trg = str(tmp_path / 'trg')
+    site_data().get_h1s(path, {'vp3'}, del_ext=True, trg_dir=trg)
+    avgh1 = os.path.join(trg, 'vp3', 'vp3_6_a1_40001001_avg.h1')
+    os.utime(avgh1, (1, 1))
+
+    site_data().get_h1s(path, {'vp3'}, del_ext=True, trg_dir=trg)
+    assert tool_runs(tmp_path).count('create_avghdf1_from_cnthdf1X') == 2
+
+
+def test_avgh1_from_before_manifests_kept(tmp_path, h1_tools):
+    path = make_cnts(tmp_path / 'site', '40001001')
+    trg = str(tmp_path / 'trg')
+    site_data().get_h1s(path, {'vp3'}, del_ext=True, trg_dir=trg)
+    manifest = os.path.join(trg, 'vp3', '.h1_manifest.json')
+    os.remove(manifest)
+    runs = len(tool_runs(tmp_path))
+
+    sd = site_data()
+    assert sd.get_h1s(path, {'vp3'}, del_ext=True, trg_dir=trg) == 0
+    assert len(tool_runs(tmp_path)) == runs
+    with open(manifest) as f:
+        assert json.load(f) == {'vp3_6_a1_40001001_avg.h1': sd.avgh1_params['vp3']}
+
+
+def test_h1_manifest_not_a_wild_file(tmp_path):
+    path = make_cnts(tmp_path / 'site', '40001001')
+    (tmp_path / 'site' / '.h1_manifest.json').write_text('{}')
+    (tmp_path / 'site' / 'notes.doc').write_text('')
+    assert erpTools.ep.remove_wild_files(path) == [os.path.join(path, 'notes.doc')]
+
+
+def make_sized(folder, size):
+    folder.mkdir(parents=True)
+    (folder / 'vp3_6_a1_{}_32.cnt'.format(folder.name)).write_bytes(b'x' * size)
+    return str(folder)
+
+
+def test_size_limits_measured_without_the_folder_checked(tmp_path, monkeypatch):
+    dirs = [make_sized(tmp_path / '4000000{}'.format(i), size) for i, size in enumerate((1000, 1100, 1200, 10))]
+    rows = erpTools.ep.measure_size_limits(dirs, margin=0.5, min_files=1)
+    limits = tmp_path / 'size_limits.json'
+    erpTools.ep.save_size_limits(rows, str(limits))
+    monkeypatch.setattr(erpTools.ep, 'size_limits', erpTools.ep.load_size_limits(str(limits))[0])
+
+    assert erpTools.ep.check_file_sizes(dirs[0]) == []
+    # the 10 byte cnt doesn't lower the limit it's checked against
+    assert erpTools.ep.check_file_sizes(dirs[3]) == ['Truncated file {} (10 bytes, expected at least 500)'.format(
+                                                     os.path.join(dirs[3], 'vp3_6_a1_40000003_32.cnt'))]
+
+
+def test_no_size_limits_noted_once_per_review(tmp_path, monkeypatch):
+    dirs = [make_sized(tmp_path / '4000000{}'.format(i), 1000) for i in range(3)]
+    monkeypatch.setattr(erpTools.ep, 'size_limits', {})
+
+    reports = ''.join(erpTools.ep.iter_review(dirs))
+    assert reports.count('No measured size limits') == 1
+    reports = ''.join(erpTools.ep.iter_review(dirs))
+    assert reports.count('No measured size limits') == 1
+
+
+def test_store_reused_for_the_same_cnt(tmp_path, h1_tools):
+    path = make_cnts(tmp_path / 'site', '40001001')
+    store = h1_store(str(tmp_path / 'store'))
+    assert site_data().get_h1s(path, {'vp3'}, del_ext=True, trg_dir=str(tmp_path / 'trg1'), store=store) == 0
+
+    sd = site_data()
+    assert sd.get_h1s(path, {'vp3'}, del_ext=True, trg_dir=str(tmp_path / 'trg2'), store=store) == 0
+    store.close()
+
+    assert tool_runs(tmp_path).count('create_avghdf1_from_cnthdf1X') == 1
+    assert len(sd.fetched) == 1
+    made, fetched = (tmp_path / i / 'vp3' / 'vp3_6_a1_40001001_avg.h1' for i in ('trg1', 'trg2'))
+    assert fetched.read_bytes() == made.read_bytes()
+    # the store's copy is its own
+    assert fetched.stat().st_nlink == 1 and made.stat().st_nlink == 1
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    made = tmp_path / 'made_avg.h1'
+    made.write_bytes(b'x' * 100)
+    store = h1_store(str(tmp_path / 'store'), cap=250)
+    store.put('aa', str(made))
+    store.put('bb', str(made))
+    assert store.fetch('aa', str(tmp_path / 'out_avg.h1'))
+    store.put('cc', str(made))
+    store.close()
+
+    assert [os.path.exists(store.stored(i)) for i in ('aa', 'bb', 'cc')] == [True, False, True]
+
+
+
+def record_cwds(monkeypatch):
+    cwds = []
+    run_tool = erpTools.run_tool
+
+    def recorded(args, cwd=None, **kwargs):
+        cwds.append(cwd)
+        return run_tool(args, cwd=cwd, **kwargs)
+
+    monkeypatch.setattr(erpTools, 'run_tool', recorded)
+    return cwds
+
+
+def test_scratch_only_publishes_avgh1(tmp_path, h1_tools, monkeypatch):
+    cwds = record_cwds(monkeypatch)
+    path = make_cnts(tmp_path / 'site', '40001001', '40001002')
+    scratch = tmp_path / 'scratch'
+    scratch.mkdir()
+    trg = tmp_path / 'trg'
+
+    assert site_data().get_h1s(path, {'vp3'}, del_ext=True, trg_dir=str(trg), scratch=str(scratch)) == 0
+
+    assert sorted(os.listdir(str(trg / 'vp3'))) == ['.h1_manifest.json', 'vp3_6_a1_40001001_avg.h1', 'vp3_6_a1_40001002_avg.h1']
+    assert cwds and all(os.path.dirname(i) == str(scratch) for i in cwds)
+    assert os.listdir(str(scratch)) == []
+
+
+def test_scratch_over_cap_works_in_trg_dir(tmp_path, h1_tools, monkeypatch):
+    cwds = record_cwds(monkeypatch)
+    path = make_cnts(tmp_path / 'site', '40001001')
+    scratch = tmp_path / 'scratch'
+    scratch.mkdir()
+    trg = tmp_path / 'trg'
+
+    assert site_data().get_h1s(path, {'vp3'}, del_ext=True, trg_dir=str(trg), scratch=str(scratch), scratch_cap=1) == 0
+
+    assert sorted(os.listdir(str(trg / 'vp3'))) == ['.h1_manifest.json', 'vp3_6_a1_40001001_avg.h1']
+    assert cwds and all(i == str(trg / 'vp3') for i in cwds)
+    assert os.listdir(str(scratch)) == []
+
+
+def make_dats(folder, exps):
+    folder.mkdir(parents=True)
+    for exp in exps:
+        (folder / '{}_6_a1_{}.dat'.format(exp, folder.name)).write_text('')
+    return str(folder)
+
+
+def test_missing_exps_from_the_site_table(tmp_path):
+    ep = erpTools.erp_data()
+    missing_gng = make_dats(tmp_path / '40000001', [i for i in ep.dat_exps if i != 'gng'])
+    complete = make_dats(tmp_path / '40000002', ep.dat_exps)
+    no_dats = make_dats(tmp_path / '40000003', [])
+    dirs = [missing_gng, complete, no_dats]
+
+    expected = [(missing_gng, 'gng', 'dat', 1, 0)]
+    assert ep.missing_exps_table(dirs, [ep.parse_site_data(i) for i in dirs]) == expected
+
+    # folders go in as their reviews come back, in any order
+    ep.start_site_table(dirs)
+    for i in reversed(dirs):
+        ep.add_to_site_table(i, ep.parse_site_data(i))
+    assert ep.site_missing() == expected
+    assert ep.site_missing([missing_gng]) == expected
+    assert ep.site_missing([complete, no_dats]) == []
+
+    reports = list(ep.iter_review(dirs))
+    assert 'Incorrect number of gng dat files in {}'.format(missing_gng) in reports[0]
+    assert 'All dat files found!' in reports[1]
+    assert 'Incorrect number' not in reports[1] + reports[2]
+
+
+def test_move_peaks_accepted_and_rejected(tmp_path, monkeypatch, capsys):
+    picked = tmp_path / 'picked' / 'vp3'
+    picked.mkdir(parents=True)
+    for name in ('vp3_6_a1_40000001_avg.h1', 'vp3_6_a1_40000001_avg.mt', 'vp3_6_a1_40000001_avg.pdf', 'vp3_6_a1_40000002_avg.h1'):
+        (picked / name).write_text(name)
+    hbnl = tmp_path / 'hbnl' / 'site'
+    (hbnl / 'reject').mkdir(parents=True)
+    monkeypatch.setattr(erpTools, 'concat_peak_paths', lambda site, exp_name: [str(tmp_path / 'hbnl' / site), str(tmp_path / 'hbnl' / site / 'reject')])
+    # already there & not to be replaced
+    (hbnl / 'vp3_6_a1_40000001_avg.pdf').write_text('picked before')
+
+    assert erpTools.start_mover(str(tmp_path / 'picked'), 'site') == 0
+
+    assert sorted(os.listdir(str(hbnl))) == ['.checksums.md5', 'reject', 'vp3_6_a1_40000001_avg.h1', 'vp3_6_a1_40000001_avg.mt', 'vp3_6_a1_40000001_avg.pdf']
+    assert (hbnl / 'vp3_6_a1_40000001_avg.pdf').read_text() == 'picked before'
+    assert sorted(os.listdir(str(hbnl / 'reject'))) == ['.checksums.md5', 'vp3_6_a1_40000002_avg.h1']
+    out = capsys.readouterr().out
+    assert out.count('Moved ') == 3
+    assert out.count('already exists!') == 1
+
+    # a second run finds everything already there
+    assert erpTools.start_mover(str(tmp_path / 'picked'), 'site') == 0
+    out = capsys.readouterr().out
+    assert 'Moved' not in out
+    assert out.count('already exists!') == 4